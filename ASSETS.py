@@ -0,0 +1,168 @@
+import os
+import hashlib
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+# Shared image cache, the image counterpart of TEXTCACHE. Every image is
+# decoded and converted to the display format once per process and reused
+# by whichever game or menu asks for it again, at any size.
+#
+# Sets of small images, such as GRIDtest's glyphs, go into an Atlas
+# instead: each source is decoded once, in a thread pool, and every size
+# wanted is packed into one RGBA buffer. That buffer is written to
+# ATLAS_CACHE_DIR, keyed by the sources' paths, mtimes and sizes, so a
+# warm start reads it back instead of decoding any PNG. The atlas surface
+# is made over the buffer with pygame.image.frombuffer, converted to the
+# display format in one copy once a window is open (blits from a plain
+# RGBA surface convert every pixel, every time), and every image is a
+# subsurface of it.
+
+ATLAS_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "obelisks")
+ATLAS_VERSION = 1  # Bump when the decoding or layout changes, to drop old cache files
+DECODE_THREADS = os.cpu_count() or 1
+
+images = {}
+
+def get_image(path, size=None):
+    """Return a shared, display-converted image, smooth-scaled to size when given"""
+    key = (path, size)
+    image = images.get(key)
+    if image is None:
+        if size is None:
+            image = pygame.image.load(path).convert_alpha()
+        else:
+            image = pygame.transform.smoothscale(get_image(path), size)
+        images[key] = image
+    return image
+
+def clear_cache():
+    # Needed after pygame.quit(), since converted images depend on the display
+    images.clear()
+
+class Atlas:
+    """Images packed into one surface, display-converted when a window is open"""
+    def __init__(self, data, width, height, rects, missing):
+        surface = pygame.image.frombuffer(data, (width, height), "RGBA")
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+            data = None
+        self.data = data  # Backs an unconverted surface, so it must outlive it
+        self.surface = surface
+        self.rects = rects  # (path, size) -> Rect in the atlas
+        self.missing = missing  # Paths that failed to load; their cells are left clear
+
+    def get(self, path, size):
+        """The image of path at size, as a subsurface of the atlas"""
+        return self.surface.subsurface(self.rects[(path, size)])
+
+def atlas_layout(paths, sizes):
+    """(rects, width, height): a column per path with a cell per size, stacked"""
+    column_width = max(width for width, height in sizes)
+    rects = {}
+    for column, path in enumerate(paths):
+        y = 0
+        for size in sizes:
+            rects[(path, size)] = pygame.Rect((column * column_width, y), size)
+            y += size[1]
+    return rects, column_width * len(paths), sum(height for width, height in sizes)
+
+def atlas_cache_path(name, paths, sizes):
+    key = hashlib.sha1(repr((ATLAS_VERSION, sizes)).encode())
+    for path in paths:
+        stat = os.stat(path)
+        key.update(repr((path, stat.st_mtime_ns, stat.st_size)).encode())
+    return os.path.join(ATLAS_CACHE_DIR, f"atlas-{name}-{key.hexdigest()}.rgba")
+
+def read_atlas_cache(path, length):
+    try:
+        if os.path.getsize(path) != length:
+            return None
+        data = bytearray(length)
+        with open(path, "rb") as f:
+            if f.readinto(data) != length:
+                return None
+        return data
+    except OSError:
+        return None
+
+def write_atlas_cache(path, data):
+    directory, file_name = os.path.split(path)
+    prefix = file_name.rsplit("-", 1)[0] + "-"
+    try:
+        os.makedirs(directory, exist_ok=True)
+        # Drop this atlas's files for older versions of the sources
+        for old in os.listdir(directory):
+            if old.startswith(prefix) and len(old) == len(file_name) and old != file_name:
+                os.remove(os.path.join(directory, old))
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+    except OSError:
+        pass  # A read-only home only costs the decoding on the next launch
+
+def decode_sizes(path, sizes):
+    """RGBA bytes of the image at path resized to each size; runs in the decode threads"""
+    from PIL import Image, ImageChops
+    with Image.open(path) as source:
+        # Images without any transparency had white keyed out, so keep that
+        opaque = source.mode not in ("RGBA", "LA", "PA") and "transparency" not in source.info
+        image = source.convert("RGBA")
+    frames = []
+    for size in sizes:
+        frame = image.resize(size)
+        if opaque:
+            white = [band.point(lambda value: 255 if value == 255 else 0) for band in frame.split()[:3]]
+            frame.putalpha(ImageChops.invert(ImageChops.multiply(ImageChops.multiply(*white[:2]), white[2])))
+        frames.append(frame.tobytes())
+    return frames
+
+def try_decode_sizes(path, sizes):
+    try:
+        return decode_sizes(path, sizes)
+    except Exception as e:
+        print(f"Error loading image {path}: {e}")
+        return None
+
+def load_atlas(name, paths, sizes, cache=True):
+    """Atlas of every path at every (width, height) in sizes.
+
+    With cache set, the decoded atlas is read from or written to the
+    on-disk cache. The name keeps different atlases' cache files apart.
+    """
+    paths = list(paths)
+    sizes = list(sizes)
+    rects, width, height = atlas_layout(paths, sizes)
+    length = width * height * 4
+    cache_path = None
+    if cache:
+        try:
+            cache_path = atlas_cache_path(name, paths, sizes)
+        except OSError:
+            pass  # A missing source is reported by the decoding below
+    data = read_atlas_cache(cache_path, length) if cache_path is not None else None
+    if data is not None:
+        return Atlas(data, width, height, rects, set())
+
+    try:
+        import PIL.Image  # Imported up front, rather than racing to in every thread
+    except ImportError as e:
+        print(f"Error loading images for the {name} atlas: {e}")
+        return Atlas(bytearray(length), width, height, rects, set(paths))
+    data = bytearray(length)
+    missing = set()
+    stride = width * 4
+    with ThreadPoolExecutor(max_workers=min(DECODE_THREADS, len(paths) or 1)) as pool:
+        for path, frames in zip(paths, pool.map(try_decode_sizes, paths, itertools.repeat(sizes))):
+            if frames is None:
+                missing.add(path)
+                continue
+            for size, frame in zip(sizes, frames):
+                rect = rects[(path, size)]
+                row_length = rect.width * 4
+                for row in range(rect.height):
+                    start = (rect.y + row) * stride + rect.x * 4
+                    data[start:start + row_length] = frame[row * row_length:(row + 1) * row_length]
+    if cache_path is not None and not missing:
+        write_atlas_cache(cache_path, data)
+    return Atlas(data, width, height, rects, missing)
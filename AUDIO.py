@@ -0,0 +1,131 @@
+import array
+import pygame
+
+# Sound effects for PONG2. Every sound is read and decoded into a mixer
+# Sound once when the SoundBank is built, then played on a fixed pool of
+# mixer channels. A sound that is asked for again within its minimum
+# interval is skipped, and when every voice is busy the oldest voice of
+# equal or lower priority is cut off, so a frame with a thousand
+# Multi-Ball hits still starts at most one blip.
+#
+# The bundled data/*.wav files are headerless 8-bit unsigned mono PCM at
+# RAW_FREQUENCY; files that start with a RIFF header load as normal WAVs.
+
+FREQUENCY = 44100
+BUFFER_SIZE = 256  # Samples per mixer callback, about 6 ms at 44.1 kHz
+VOICES = 8
+RAW_FREQUENCY = 44100
+
+SOUNDS = {
+    # priority decides which voices may be stolen; min_interval is in ms
+    "blip": {"file": "data/blip.wav", "volume": 0.5, "priority": 0, "min_interval": 40},
+    "powerup": {"file": "data/powerup.wav", "volume": 0.7, "priority": 1, "min_interval": 80},
+    "score": {"file": "data/score.wav", "volume": 0.8, "priority": 2, "min_interval": 150}
+}
+
+# PongSimulation event kind -> sound name
+EVENT_SOUNDS = {"hit": "blip", "pickup": "powerup", "goal": "score"}
+
+def pre_init():
+    """Ask for a small mixer buffer; must run before pygame.init()"""
+    pygame.mixer.pre_init(FREQUENCY, -16, 2, BUFFER_SIZE)
+
+def decode_raw(data, frequency, channels):
+    # Unsigned 8-bit mono to the mixer's signed 16-bit format, resampled
+    # (nearest sample) to its frequency and copied to every channel
+    step = RAW_FREQUENCY / frequency
+    count = int(len(data) / step)
+    samples = array.array("h")
+    for i in range(count):
+        value = (data[int(i * step)] - 128) << 8
+        for _ in range(channels):
+            samples.append(value)
+    return pygame.mixer.Sound(buffer=samples.tobytes())
+
+def load_sound(path, frequency, channels):
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] == b"RIFF":
+        return pygame.mixer.Sound(file=path)
+    return decode_raw(data, frequency, channels)
+
+class SoundBank:
+    """Preloaded sounds played on a fixed voice pool with rate limits.
+
+    Does nothing if the mixer could not be opened, e.g. on machines
+    without an audio device.
+    """
+    def __init__(self, sounds=SOUNDS, voices=VOICES, pan_width=None):
+        self.enabled = False
+        self.pan_width = pan_width  # Width of the playfield that x positions pan across
+        if not pygame.mixer.get_init():
+            try:
+                pygame.mixer.init()
+            except pygame.error:
+                return
+        frequency, size, channels = pygame.mixer.get_init()
+        if size != -16:
+            return  # decode_raw() only writes signed 16-bit samples
+
+        self.sounds = {}
+        for name, config in sounds.items():
+            sound = load_sound(config["file"], frequency, channels)
+            sound.set_volume(config["volume"])
+            self.sounds[name] = (sound, config["priority"], config["min_interval"])
+
+        pygame.mixer.set_num_channels(voices)
+        self.voices = [pygame.mixer.Channel(i) for i in range(voices)]
+        self.voice_priority = [0] * voices
+        self.voice_started = [0] * voices
+        self.last_played = dict.fromkeys(self.sounds, -10 ** 9)
+        self.stereo = channels == 2
+        self.enabled = True
+
+    def find_voice(self, priority):
+        # An idle voice, else the oldest one not playing anything more important
+        oldest = None
+        for i, voice in enumerate(self.voices):
+            if not voice.get_busy():
+                return i
+            if self.voice_priority[i] <= priority and (oldest is None or
+                                                      self.voice_started[i] < self.voice_started[oldest]):
+                oldest = i
+        return oldest
+
+    def play(self, name, x=None, now=None):
+        """Start a sound, panned by x if given; returns False if it was skipped"""
+        if not self.enabled:
+            return False
+        sound, priority, min_interval = self.sounds[name]
+        if now is None:
+            now = pygame.time.get_ticks()
+        if now - self.last_played[name] < min_interval:
+            return False
+        i = self.find_voice(priority)
+        if i is None:
+            return False
+        self.last_played[name] = now
+        self.voice_priority[i] = priority
+        self.voice_started[i] = now
+        voice = self.voices[i]
+        voice.play(sound)
+        if x is not None and self.pan_width and self.stereo:
+            # play() resets the stereo volume, so pan afterwards
+            pan = min(max(x / self.pan_width, 0.0), 1.0)
+            voice.set_volume(1.0 - pan * 0.6, 0.4 + pan * 0.6)
+        return True
+
+    def play_events(self, events):
+        """Play the sounds for a PongSimulation step's events"""
+        if not self.enabled or not events:
+            return
+        now = pygame.time.get_ticks()
+        for event in events:
+            name = EVENT_SOUNDS.get(event[0])
+            if name is not None:
+                self.play(name, event[-2], now)
+
+    def stop(self):
+        if self.enabled:
+            for voice in self.voices:
+                voice.stop()
@@ -0,0 +1,316 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import gc
+import sys
+import json
+import time
+import fnmatch
+import platform
+import argparse
+import statistics
+import pygame
+
+# Benchmarks for PONG2 physics, PONG2, particle and GRID rendering and GRIDtest glyph
+# loading, run without a real display. Every benchmark is seeded and timed
+# as the median of several rounds after a warm-up, and results are written
+# as JSON. Given a baseline file from an earlier run, every metric is
+# compared against it and the exit status is 1 if any got worse by more
+# than the threshold.
+#
+#   python BENCHMARK.py --output before.json
+#   python BENCHMARK.py --baseline before.json --threshold 0.1
+#
+# --allocations instead plays warmed-up PONG2 matches under tracemalloc,
+# through the bare simulation and through the scene and dirty renderer,
+# and fails if either loop keeps memory or triggers garbage collection.
+
+BALL_COUNTS = (1, 100, 1000, 10000)
+SEED = 1234
+
+benchmarks = []
+
+def benchmark(name, unit):
+    """Register setup(), which returns the function to time; unit is per second unless it is ms"""
+    def register(setup):
+        benchmarks.append((name, unit, setup))
+        return setup
+    return register
+
+def measure(function, min_time, rounds):
+    """Median calls per second of function over rounds timed rounds"""
+    # Warm up, then size each round to take about min_time / rounds
+    start = time.perf_counter()
+    calls = 0
+    while calls < 3 or time.perf_counter() - start < min_time / rounds / 2:
+        function()
+        calls += 1
+    per_round = max(1, int(calls / (time.perf_counter() - start) * min_time / rounds))
+    rates = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(per_round):
+            function()
+        rates.append(per_round / (time.perf_counter() - start))
+    return statistics.median(rates)
+
+def pong_step(ball_count, numpy_balls):
+    def setup():
+        import PONG2
+        # Stress mode keeps the ball count fixed; one primary plus extra balls
+        sim = PONG2.PongSimulation(seed=SEED, numpy_balls=numpy_balls, stress_balls=ball_count - 1)
+        return lambda: sim.step(1, -1)
+    return setup
+
+def pong_draw(ball_count):
+    def setup():
+        import PONG2
+        screen = pygame.display.set_mode((PONG2.WIDTH, PONG2.HEIGHT))
+        sim = PONG2.PongSimulation(seed=SEED, stress_balls=ball_count - 1)
+        for _ in range(60):
+            sim.step(1, -1)
+        return lambda: PONG2.draw_game(screen, sim)
+    return setup
+
+def have_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return False
+    return True
+
+for count in BALL_COUNTS:
+    benchmark(f"pong2.step.list.{count}_balls", "ticks")(pong_step(count, False))
+    if have_numpy():
+        benchmark(f"pong2.step.numpy.{count}_balls", "ticks")(pong_step(count, True))
+for count in (1, 100):
+    benchmark(f"pong2.draw_game.{count}_balls", "frames")(pong_draw(count))
+
+def particles_full_budget():
+    import random
+    from PARTICLES import ParticleSystem, MAX_PARTICLES, HIT_SPARKS
+    screen = pygame.display.set_mode((1000, 700))
+    rng = random.Random(SEED)
+    particles = ParticleSystem(seed=SEED)
+    # Long-lived sparks, so the budget stays full while timing
+    spread = 10 * MAX_PARTICLES
+    particles.emit([rng.uniform(0, 1000) for _ in range(spread)], [rng.uniform(0, 700) for _ in range(spread)],
+                   1, HIT_SPARKS[1], 1e9, (255, 255, 160))
+    def frame():
+        particles.update(1 / 60)
+        particles.draw(screen)
+    return frame
+
+if have_numpy():
+    benchmark("particles.full_budget", "frames")(particles_full_budget)
+
+@benchmark("grid.draw", "frames")
+def grid_draw():
+    import GRID
+    GRID.init()
+    code_lock = GRID.MinesweeperCodeLock()
+    for index in range(0, 9, 2):
+        code_lock.toggle_cell(index)
+    return lambda: code_lock.draw(GRID.window)
+
+@benchmark("grid.click.256x256", "frames")
+def grid_click_large():
+    import random
+    import GRID
+    GRID.init()
+    rng = random.Random(SEED)
+    code_lock = GRID.MinesweeperCodeLock(GRID.MAX_GRID_SIZE)
+    def frame():
+        code_lock.toggle_cell(rng.randrange(code_lock.cell_count))
+        code_lock.check_code()
+        code_lock.draw(GRID.window)
+    return frame
+
+@benchmark("gridtest.glyph_atlas.decode", "ms")
+def glyph_atlas_decode():
+    import GRIDtest
+    GRIDtest.init()
+    return lambda: GRIDtest.load_glyph_atlas(cache=False)
+
+@benchmark("gridtest.glyph_atlas.cached", "ms")
+def glyph_atlas_cached():
+    import GRIDtest
+    GRIDtest.init()  # Writes the cache if it isn't there yet
+    return GRIDtest.load_glyph_atlas
+
+def run(patterns, min_time, rounds):
+    results = {}
+    for name, unit, setup in benchmarks:
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        rate = measure(setup(), min_time, rounds)
+        if unit == "ms":
+            result = {"value": 1000 / rate, "unit": "ms", "higher_is_better": False}
+        else:
+            result = {"value": rate, "unit": f"{unit}/s", "higher_is_better": True}
+        results[name] = result
+        print(f"{name:<36}{result['value']:>14.2f} {result['unit']}")
+    return results
+
+ALLOWED_GROWTH = 16384  # Bytes a steady-state window may keep; live state (particles, dirty rects) varies by a few KB
+
+def allocation_loops():
+    """(name, frame function) of the PONG2 frame loops the allocation check plays"""
+    import PONG2
+    screen = pygame.display.set_mode((PONG2.WIDTH, PONG2.HEIGHT))
+    sim = PONG2.PongSimulation(seed=SEED)
+    ai1 = PONG2.InterceptAI(sim, 1)
+    ai2 = PONG2.InterceptAI(sim, 2)
+    
+    def step_frame():
+        sim.step(ai1.move(), ai2.move())
+        PONG2.draw_game(screen, sim)
+    yield "step+draw_game", step_frame
+    
+    # The loop players run: physics, sound and particles in the scene, drawn by the dirty renderer
+    sim = PONG2.PongSimulation(seed=SEED)
+    scene = PONG2.PongScene(sim, PONG2.InterceptAI(sim, 1), PONG2.InterceptAI(sim, 2))
+    scene.enter(screen)
+    renderer = PONG2.DirtyRenderer(screen)
+    effects = scene.particles.draw if scene.particles is not None else None
+    
+    def scene_frame():
+        scene.update(1 / PONG2.FPS)
+        renderer.draw(sim, None, scene.alpha, effects)
+    yield "scene+DirtyRenderer", scene_frame
+    scene.exit()
+
+def check_allocations(frames, warmup):
+    """Play AI-vs-AI PONG2 frames under tracemalloc; True if every loop keeps no memory.
+    
+    After warmup frames, each loop plays two windows of frames. The first
+    settles one-time allocations. The second may keep at most ALLOWED_GROWTH
+    bytes, however many frames it has, and no garbage collection may
+    run in either window.
+    """
+    import re
+    import tracemalloc
+    import TEXTCACHE
+    # The text cache is bounded by TEXTCACHE.MAX_TEXT_SURFACES, and filtering
+    # the snapshots fills re's pattern cache
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+               tracemalloc.Filter(False, TEXTCACHE.__file__),
+               tracemalloc.Filter(False, os.path.join(os.path.dirname(re.__file__), "*"))]
+    collections = [0]
+    measuring = [False]
+    def count_collection(phase, info):
+        # Snapshots allocate enough to collect, so only count during frames
+        if phase == "start" and measuring[0]:
+            collections[0] += 1
+    
+    passed = True
+    for name, frame in allocation_loops():
+        for _ in range(warmup):
+            frame()
+        gc.collect()
+        collections[0] = 0
+        gc.callbacks.append(count_collection)
+        tracemalloc.start(1)
+        snapshots = [tracemalloc.take_snapshot().filter_traces(filters)]
+        for _ in range(2):
+            measuring[0] = True
+            for _ in range(frames):
+                frame()
+            measuring[0] = False
+            snapshots.append(tracemalloc.take_snapshot().filter_traces(filters))
+        tracemalloc.stop()
+        gc.callbacks.remove(count_collection)
+        
+        settle, steady = (after.compare_to(before, "traceback")
+                          for before, after in zip(snapshots, snapshots[1:]))
+        growth = sum(stat.size_diff for stat in steady)
+        ok = growth <= ALLOWED_GROWTH and not collections[0]
+        print(f"{name}: {frames} frames settled {sum(stat.size_diff for stat in settle):+d} bytes, "
+              f"then {frames} more kept {growth:+d} bytes (allowed {ALLOWED_GROWTH}), "
+              f"{collections[0]} GC runs -> {'ok' if ok else 'FAIL'}")
+        if not ok:
+            passed = False
+            for stat in steady[:5]:
+                print(stat)
+                print("\n".join(stat.traceback.format()))
+    return passed
+
+def environment():
+    versions = {"python": platform.python_version(), "pygame": pygame.version.ver}
+    try:
+        import numpy
+        versions["numpy"] = numpy.__version__
+    except ImportError:
+        pass
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "versions": versions,
+        "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+def compare(results, baseline, threshold):
+    """Print each metric's change against the baseline; returns the regressed names"""
+    regressions = []
+    print(f"\n{'benchmark':<36}{'baseline':>14}{'now':>14}{'change':>9}")
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None or not old["value"]:
+            print(f"{name:<36}{'-':>14}{result['value']:>14.2f}{'new':>9}")
+            continue
+        change = result["value"] / old["value"] - 1
+        worse = -change if result["higher_is_better"] else change
+        flag = ""
+        if worse > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36}{old['value']:>14.2f}{result['value']:>14.2f}{change:>+9.1%}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PONG2, GRID and GRIDtest headlessly.")
+    parser.add_argument("patterns", nargs="*", help="only run benchmarks matching these globs")
+    parser.add_argument("--output", metavar="FILE", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against an earlier --output file")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="relative slowdown counted as a regression (default: 0.1)")
+    parser.add_argument("--min-time", type=float, default=1.0,
+                        help="seconds spent timing each benchmark (default: 1)")
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds per benchmark")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    parser.add_argument("--allocations", type=int, nargs="?", const=10800, metavar="FRAMES",
+                        help="check that windows of this many PONG2 frames (default: 10800) keep no memory")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, unit, setup in benchmarks:
+            print(name)
+        return 0
+
+    # The games load their images relative to the working directory
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    pygame.init()
+    if args.allocations:
+        return 0 if check_allocations(args.allocations, warmup=3600) else 1
+    results = run(args.patterns, args.min_time, args.rounds)
+    report = {"environment": environment(), "results": results}
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,20 @@
+import STARTUP  # First, so the startup clock covers the other imports
 import pygame
 import os
 import sys
 from pygame.locals import *
 import random
-
-# Initialize pygame
-pygame.init()
+import argparse
+from TEXTCACHE import get_font, render_text
+from PROFILER import FrameProfiler
+from IDLE import block_high_rate_events, wait_events, REDRAW_EVENTS
+from MINEFIELD import random_board_symbols
+from SCENES import Scene
 
 # Set up the window
 WINDOW_WIDTH = 600
 WINDOW_HEIGHT = 700
-window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("Minesweeper Code Lock")
+window = None  # Opened by init()
 
 # Colors
 WHITE = (255, 255, 255)
@@ -22,11 +25,12 @@ LIGHT_GRAY = (224, 224, 224)
 GREEN = (0, 128, 0)  # Darker green for retro look
 RED = (255, 0, 0)
 BLUE = (0, 0, 128)  # Classic Windows blue
+NAVY = (0, 0, 64)
+MAROON = (128, 0, 0)
+TEAL = (0, 128, 128)
 
-# Font - use a more pixelated/retro font
-font = pygame.font.SysFont('Courier New', 24)
-small_font = pygame.font.SysFont('Courier New', 18)
-title_font = pygame.font.SysFont('Courier New', 30, bold=True)
+# Font - use a more pixelated/retro font, loaded by init()
+font = small_font = title_font = None
 
 # Symbol names - we'll use minesweeper themes
 SYMBOLS = [
@@ -41,16 +45,109 @@ SYMBOLS = [
     'smiley'
 ]
 
+# Hint numbers (mines around a cell) and their classic colors
+HINT_NUMBERS = {
+    'one': ("1", BLUE),
+    'two': ("2", GREEN),
+    'three': ("3", RED),
+    'four': ("4", NAVY),
+    'five': ("5", MAROON),
+    'six': ("6", TEAL),
+    'seven': ("7", BLACK),
+    'eight': ("8", DARK_GRAY)
+}
+
+# Every symbol a cell can show
+CELL_SYMBOLS = SYMBOLS + [symbol for symbol in HINT_NUMBERS if symbol not in SYMBOLS]
+
+# Border around every pre-rendered sprite; the 3D lines reach a pixel past their rect
+SPRITE_PAD = 2
+
 # Correct code - which cells should be toggled on
 CORRECT_CODE = [False, True, False, 
                 True, False, True, 
                 False, True, False]  # A pattern like an X
 
+# Grid sizes; the grid always fits in GRID_AREA pixels, so big grids get small cells
+DEFAULT_GRID_SIZE = 3
+MAX_GRID_SIZE = 256
+GRID_AREA = 316
+
+def code_bits(cells):
+    """Bitset of a list of cell states, cell i in bit i"""
+    bits = 0
+    for index, toggled in enumerate(cells):
+        if toggled:
+            bits |= 1 << index
+    return bits
+
+class CellAtlas:
+    """Every cell look and reset button face for one cell size, drawn once into one surface.
+    
+    Sprites are drawn over the gray panel they are blitted onto, padded by
+    up to SPRITE_PAD, so blitting a whole slot gives the same pixels as
+    drawing the primitives in place. Cells closer together than two pads
+    are padded less, so they don't paint over their neighbors.
+    """
+    def __init__(self, code_lock):
+        self.cell_size = code_lock.cell_size
+        self.pad = pad = min(SPRITE_PAD, code_lock.grid_margin // 2)
+        cell_slot = self.cell_size + 2 * SPRITE_PAD
+        button = code_lock.reset_button
+        button_slot = (button.width + 2 * SPRITE_PAD, button.height + 2 * SPRITE_PAD)
+        statuses = (None, True, False)
+        
+        self.surface = pygame.Surface((max(cell_slot * (len(CELL_SYMBOLS) + 1), button_slot[0] * len(statuses)),
+                                       cell_slot + button_slot[1]))
+        self.surface.fill(GRAY)
+        self.areas = {}  # (symbol, toggled) or reset button status -> area of the atlas
+        
+        # Untoggled cells look the same whatever their symbol
+        rect = pygame.Rect(SPRITE_PAD, SPRITE_PAD, self.cell_size, self.cell_size)
+        code_lock.draw_3d_rect(self.surface, rect, GRAY, True)
+        for symbol in CELL_SYMBOLS:
+            self.areas[(symbol, False)] = rect.inflate(2 * pad, 2 * pad)
+        for slot, symbol in enumerate(CELL_SYMBOLS, 1):
+            rect = pygame.Rect(slot * cell_slot + SPRITE_PAD, SPRITE_PAD, self.cell_size, self.cell_size)
+            pygame.draw.rect(self.surface, LIGHT_GRAY, rect)
+            code_lock.draw_3d_rect(self.surface, rect, LIGHT_GRAY, False)
+            code_lock.draw_symbol(self.surface, rect, symbol, True)
+            self.areas[(symbol, True)] = rect.inflate(2 * pad, 2 * pad)
+        
+        for slot, status in enumerate(statuses):
+            rect = pygame.Rect(slot * button_slot[0] + SPRITE_PAD, cell_slot + SPRITE_PAD,
+                               button.width, button.height)
+            code_lock.draw_3d_rect(self.surface, rect, GRAY, True)
+            code_lock.draw_smiley(self.surface, rect, status)
+            self.areas[status] = rect.inflate(2 * SPRITE_PAD, 2 * SPRITE_PAD)
+    
+    def blit_cell(self, symbol, toggled, rect):
+        # (source, destination, area) for Surface.blits
+        return self.surface, (rect.x - self.pad, rect.y - self.pad), self.areas[(symbol, toggled)]
+
 class MinesweeperCodeLock:
-    def __init__(self):
-        self.grid_size = 3
-        self.cell_size = 100
-        self.grid_margin = 8  # Classic chunky borders
+    """Code lock over a grid_size x grid_size grid of cells.
+    
+    Cell states and the code are integer bitsets (cell index i is bit i),
+    so toggling is one XOR and checking the code one compare at any size.
+    code defaults to CORRECT_CODE on the 3x3 grid and to a random pattern
+    on bigger ones.
+    """
+    def __init__(self, grid_size=DEFAULT_GRID_SIZE, code=None):
+        if not 1 <= grid_size <= MAX_GRID_SIZE:
+            raise ValueError(f"grid_size must be between 1 and {MAX_GRID_SIZE}")
+        self.grid_size = grid_size
+        self.cell_count = grid_size * grid_size
+        if code is None:
+            if grid_size == DEFAULT_GRID_SIZE:
+                code = code_bits(CORRECT_CODE)
+            else:
+                code = random.getrandbits(self.cell_count)
+        self.code = code
+        
+        # Classic chunky borders, thinning out as cells get smaller
+        self.grid_margin = min(8, 24 // grid_size)
+        self.cell_size = max(1, (GRID_AREA - (grid_size - 1) * self.grid_margin) // grid_size)
         
         # Calculate grid position to center it
         self.grid_width = self.grid_size * self.cell_size + (self.grid_size - 1) * self.grid_margin
@@ -59,9 +156,9 @@ class MinesweeperCodeLock:
         self.grid_x = (WINDOW_WIDTH - self.grid_width) // 2
         self.grid_y = 150
         
-        # Create grid cells - True means toggled/revealed, False means not toggled
-        self.grid = [False] * 9
-        self.grid_symbols = [random.choice(SYMBOLS) for _ in range(9)]  # Assign random symbols
+        # Grid cells - a set bit means toggled/revealed
+        self.grid = 0
+        self.grid_symbols = random_board_symbols(grid_size)  # Mines and their hint numbers
         self.status = None  # None = not checked, True = correct, False = incorrect
         self.attempts = 0
         
@@ -90,39 +187,57 @@ class MinesweeperCodeLock:
         # Game title
         self.title = "MINESWEEPER CODE"
         
+        # Pre-rendered cells, rebuilt when the cell size changes
+        self.atlas = None
+        # Every cell drawn over the panel gray; toggles patch their cell and
+        # reset() drops it, so big grids don't redraw every cell each frame
+        self.grid_layer = None
+        self.grid_layer_atlas = None
+        
     def get_cell_rect(self, row, col):
         x = self.grid_x + col * (self.cell_size + self.grid_margin)
         y = self.grid_y + row * (self.cell_size + self.grid_margin)
         return pygame.Rect(x, y, self.cell_size, self.cell_size)
     
     def get_cell_index(self, position):
-        for row in range(self.grid_size):
-            for col in range(self.grid_size):
-                rect = self.get_cell_rect(row, col)
-                if rect.collidepoint(position):
-                    return row * self.grid_size + col
+        # Which cell pitch the point falls in, then whether it hit the cell or the margin
+        pitch = self.cell_size + self.grid_margin
+        col, x = divmod(position[0] - self.grid_x, pitch)
+        row, y = divmod(position[1] - self.grid_y, pitch)
+        if 0 <= row < self.grid_size and 0 <= col < self.grid_size and x < self.cell_size and y < self.cell_size:
+            return row * self.grid_size + col
         return None
     
+    def is_toggled(self, index):
+        return self.grid >> index & 1 == 1
+    
+    def toggled_cells(self):
+        """Every cell's state as a string of '0' and '1', cell 0 first"""
+        return format(self.grid, f"0{self.cell_count}b")[::-1]
+    
     def toggle_cell(self, index):
         if index is None:
             return
             
         # Simply toggle the state
-        self.grid[index] = not self.grid[index]
+        self.grid ^= 1 << index
+        if self.grid_layer is not None:
+            self.grid_layer.blit(*self.cell_blit(self.grid_layer_atlas, index, self.is_toggled(index)))
         
         # Reset status when changing grid
         self.status = None
     
     def check_code(self):
         # Check if current grid matches correct code
-        self.status = (self.grid == CORRECT_CODE)
+        self.status = (self.grid == self.code)
         self.attempts += 1
         return self.status
     
     def reset(self):
-        self.grid = [False] * 9
-        # Reassign random symbols for fun
-        self.grid_symbols = [random.choice(SYMBOLS) for _ in range(9)]
+        self.grid = 0
+        # Deal a new minefield for fun
+        self.grid_symbols = random_board_symbols(self.grid_size)
+        self.grid_layer = None
         self.status = None
     
     def draw_3d_rect(self, surface, rect, color, raised=True):
@@ -198,16 +313,9 @@ class MinesweeperCodeLock:
             self.draw_mine(surface, rect)
         elif symbol == 'flag':
             self.draw_flag(surface, rect)
-        elif symbol == 'one':
-            text = font.render("1", True, BLUE)
-            text_rect = text.get_rect(center=rect.center)
-            surface.blit(text, text_rect)
-        elif symbol == 'two':
-            text = font.render("2", True, GREEN)
-            text_rect = text.get_rect(center=rect.center)
-            surface.blit(text, text_rect)
-        elif symbol == 'three':
-            text = font.render("3", True, RED)
+        elif symbol in HINT_NUMBERS:
+            number, color = HINT_NUMBERS[symbol]
+            text = render_text(font, number, color)
             text_rect = text.get_rect(center=rect.center)
             surface.blit(text, text_rect)
         elif symbol == 'clock':
@@ -220,7 +328,7 @@ class MinesweeperCodeLock:
             pygame.draw.line(surface, BLACK, center, 
                             (center[0] + hand_length, center[1]), 2)
         elif symbol == 'question':
-            text = font.render("?", True, BLUE)
+            text = render_text(font, "?", BLUE)
             text_rect = text.get_rect(center=rect.center)
             surface.blit(text, text_rect)
         elif symbol == 'smiley':
@@ -310,96 +418,196 @@ class MinesweeperCodeLock:
                                      rect.height // 3), 
                            3.14, 2*3.14, 3)
     
+    def get_atlas(self):
+        if (self.atlas is None or self.atlas.cell_size != self.cell_size
+                or self.atlas.pad != min(SPRITE_PAD, self.grid_margin // 2)):
+            self.atlas = CellAtlas(self)
+        return self.atlas
+    
+    def cell_blit(self, atlas, index, toggled):
+        # Blit of one cell onto the grid layer
+        rect = self.get_cell_rect(*divmod(index, self.grid_size))
+        rect.move_ip(SPRITE_PAD - self.grid_x, SPRITE_PAD - self.grid_y)
+        return atlas.blit_cell(self.grid_symbols[index], toggled, rect)
+    
+    def get_grid_layer(self):
+        atlas = self.get_atlas()
+        if self.grid_layer is None or self.grid_layer_atlas is not atlas:
+            layer = pygame.Surface((self.grid_width + 2 * SPRITE_PAD, self.grid_height + 2 * SPRITE_PAD))
+            layer.fill(GRAY)
+            toggled = self.toggled_cells()
+            layer.blits([self.cell_blit(atlas, index, toggled[index] == "1")
+                         for index in range(self.cell_count)], False)
+            self.grid_layer = layer
+            self.grid_layer_atlas = atlas
+        return self.grid_layer
+    
     def draw(self, surface):
+        atlas = self.get_atlas()
+        
         # Fill background with classic Windows gray
         surface.fill(GRAY)
         
         # Draw title
-        title = title_font.render(self.title, True, BLACK)
+        title = render_text(title_font, self.title, BLACK)
         title_rect = title.get_rect(center=(WINDOW_WIDTH // 2, 50))
         surface.blit(title, title_rect)
         
         # Draw attempts counter
-        attempts_text = small_font.render(f"Attempts: {self.attempts}", True, BLACK)
+        attempts_text = render_text(small_font, f"Attempts: {self.attempts}", BLACK)
         surface.blit(attempts_text, (20, 20))
         
         # Draw outer border (Windows 95 style raised panel)
         self.draw_3d_rect(surface, self.outer_border, GRAY, True)
         
         # Draw reset button (smiley face)
-        self.draw_3d_rect(surface, self.reset_button, GRAY, True)
-        self.draw_smiley(surface, self.reset_button, self.status)
-        
-        # Draw grid cells
-        for row in range(self.grid_size):
-            for col in range(self.grid_size):
-                index = row * self.grid_size + col
-                rect = self.get_cell_rect(row, col)
-                
-                # Draw cell background - raised if not toggled, sunken if toggled
-                if self.grid[index]:
-                    # Toggled cell is sunken with light gray background
-                    pygame.draw.rect(surface, LIGHT_GRAY, rect)
-                    self.draw_3d_rect(surface, rect, LIGHT_GRAY, False)
-                    # Draw the symbol
-                    self.draw_symbol(surface, rect, self.grid_symbols[index], True)
-                else:
-                    # Untoggled cell is raised button
-                    self.draw_3d_rect(surface, rect, GRAY, True)
+        surface.blit(atlas.surface, (self.reset_button.x - SPRITE_PAD, self.reset_button.y - SPRITE_PAD),
+                     atlas.areas[self.status])
+        
+        # Draw grid cells - raised if not toggled, sunken with their symbol if toggled
+        surface.blit(self.get_grid_layer(), (self.grid_x - SPRITE_PAD, self.grid_y - SPRITE_PAD))
         
         # Draw check button (Windows 95 style)
         self.draw_3d_rect(surface, self.check_button, GRAY, True)
         
-        check_text = font.render("Check Code", True, BLACK)
+        check_text = render_text(font, "Check Code", BLACK)
         check_text_rect = check_text.get_rect(center=self.check_button.center)
         surface.blit(check_text, check_text_rect)
         
         # Draw status message if applicable
         if self.status is not None:
             if self.status:
-                status_text = font.render("ACCESS GRANTED!", True, GREEN)
+                status_text = render_text(font, "ACCESS GRANTED!", GREEN)
             else:
-                status_text = font.render("ACCESS DENIED!", True, RED)
+                status_text = render_text(font, "ACCESS DENIED!", RED)
             
             status_rect = status_text.get_rect(center=(WINDOW_WIDTH // 2, self.check_button.bottom + 40))
             surface.blit(status_text, status_rect)
         
         # Draw hint/tips
-        tip_text = small_font.render("Click cells to toggle them on/off", True, BLACK)
+        tip_text = render_text(small_font, "Click cells to toggle them on/off", BLACK)
         tip_rect = tip_text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT - 40))
         surface.blit(tip_text, tip_rect)
 
-def main():
-    clock = pygame.time.Clock()
-    code_lock = MinesweeperCodeLock()
+def init():
+    """Initialize pygame, open the window and load the fonts; importing GRID does none of it"""
+    global window, font, small_font, title_font
+    if window is None:
+        pygame.init()
+        STARTUP.mark("pygame.init")
+        window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        pygame.display.set_caption("Minesweeper Code Lock")
+        STARTUP.mark("display")
+    if font is None:
+        font = get_font('Courier New', 24, sysfont=True)
+        small_font = get_font('Courier New', 18, sysfont=True)
+        title_font = get_font('Courier New', 30, bold=True, sysfont=True)
+        STARTUP.mark("fonts")
+    return window
+
+class CodeLockScene(Scene):
+    """The code lock as a scene, for the launcher and for main()"""
+    title = "Minesweeper Code Lock"
+    size = (WINDOW_WIDTH, WINDOW_HEIGHT)
+    idle = True  # Nothing here reacts to hovering or time
+    
+    def __init__(self, grid_size=DEFAULT_GRID_SIZE):
+        self.grid_size = grid_size
+        self.code_lock = None
+    
+    def enter(self, screen):
+        global window
+        window = screen
+        init()
+        if self.code_lock is None:
+            self.code_lock = MinesweeperCodeLock(self.grid_size)
+    
+    def handle_event(self, event):
+        if event.type != MOUSEBUTTONDOWN or event.button != 1:  # Left mouse button only
+            return False
+        code_lock = self.code_lock
+        redraw = False
+        
+        # Check if a grid cell was clicked
+        cell_index = code_lock.get_cell_index(event.pos)
+        if cell_index is not None:
+            code_lock.toggle_cell(cell_index)
+            redraw = True
+        
+        # Check if reset button was clicked
+        if code_lock.reset_button.collidepoint(event.pos):
+            code_lock.reset()
+            redraw = True
+        
+        # Check if check button was clicked
+        if code_lock.check_button.collidepoint(event.pos):
+            code_lock.check_code()
+            redraw = True
+        return redraw
+    
+    def draw(self, surface):
+        self.code_lock.draw(surface)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Minesweeper Code Lock")
+    parser.add_argument('--size', type=int, default=DEFAULT_GRID_SIZE, metavar='N',
+                        help=f'play on an N x N grid, up to {MAX_GRID_SIZE} (default: {DEFAULT_GRID_SIZE})')
+    parser.add_argument('--profile', action='store_true',
+                        help='start with the frame profiler overlay shown (toggle with F3)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='write per-frame phase timings as a Chrome trace')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print how long each startup step took once the first frame is shown')
+    args = parser.parse_args(argv)
+    
+    if not 1 <= args.size <= MAX_GRID_SIZE:
+        parser.error(f'--size must be between 1 and {MAX_GRID_SIZE}')
     
+    STARTUP.mark("imports")
+    scene = CodeLockScene(args.size)
+    scene.enter(init())
+    STARTUP.mark("board")
+    profiler = FrameProfiler(args.trace, args.profile)
+    phase = profiler.phase
+    
+    # Nothing here reacts to hovering, so the loop sleeps until a click,
+    # key press or window event and only redraws when one changed something
+    block_high_rate_events()
+    redraw = True
     running = True
     while running:
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                running = False
+        events = wait_events()
+        profiler.begin_frame()
+        with phase("input"):
+            for event in events:
+                if event.type == QUIT:
+                    running = False
+                
+                elif event.type in REDRAW_EVENTS:
+                    redraw = True
+                
+                elif scene.handle_event(event):
+                    redraw = True
+                
+                elif profiler.handle_event(event):
+                    redraw = True
+        
+        if redraw:
+            # Draw the code lock
+            with phase("draw"):
+                scene.draw(window)
+                profiler.draw(window)
             
-            elif event.type == MOUSEBUTTONDOWN:
-                if event.button == 1:  # Left mouse button
-                    # Check if a grid cell was clicked
-                    cell_index = code_lock.get_cell_index(event.pos)
-                    if cell_index is not None:
-                        code_lock.toggle_cell(cell_index)
-                    
-                    # Check if reset button was clicked
-                    if code_lock.reset_button.collidepoint(event.pos):
-                        code_lock.reset()
-                    
-                    # Check if check button was clicked
-                    if code_lock.check_button.collidepoint(event.pos):
-                        code_lock.check_code()
-        
-        # Draw the code lock
-        code_lock.draw(window)
-        
-        pygame.display.update()
-        clock.tick(30)
+            with phase("display.update"):
+                pygame.display.update()
+            redraw = False
+            if args.startup_report:
+                STARTUP.mark("first frame")
+                STARTUP.report()
+                args.startup_report = False
+        profiler.end_frame()
     
+    profiler.close()
     pygame.quit()
     sys.exit()
 
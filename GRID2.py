@@ -1,21 +1,62 @@
+import STARTUP  # First, so the startup clock covers the other imports
 import pygame
 import sys
+import argparse
+from IDLE import block_high_rate_events, wait_events, REDRAW_EVENTS
+from SCENES import Scene
 
 SCREEN_WIDTH = 500
 SCREEN_HEIGHT = 400
 GREEN = (0, 200, 0)
 
-pygame.init()
-surface = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("MINESWEEPER")
-surface.fill(GREEN)
+class MinesweeperScene(Scene):
+    """The minesweeper field as a scene, for the launcher and for main(); any key leaves it"""
+    title = "MINESWEEPER"
+    size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+    idle = True  # Nothing moves, so sleep until input
 
-while True:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
+    def handle_event(self, event):
         if event.type == pygame.KEYDOWN:
-            pygame.quit()
-            sys.exit()
-    pygame.display.update()
+            self.finished = True
+        return False
+
+    def draw(self, surface):
+        surface.fill(GREEN)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MINESWEEPER")
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print how long each startup step took once the first frame is shown')
+    args = parser.parse_args(argv)
+    STARTUP.mark("imports")
+
+    pygame.init()
+    STARTUP.mark("pygame.init")
+    surface = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("MINESWEEPER")
+    STARTUP.mark("display")
+    scene = MinesweeperScene()
+    scene.enter(surface)
+
+    # Sleep until input and repaint only when asked to
+    block_high_rate_events()
+    redraw = True
+    while True:
+        if redraw:
+            scene.draw(surface)
+            pygame.display.update()
+            redraw = False
+            if args.startup_report:
+                STARTUP.mark("first frame")
+                STARTUP.report()
+                args.startup_report = False
+        for event in wait_events():
+            scene.handle_event(event)
+            if event.type == pygame.QUIT or scene.finished:
+                pygame.quit()
+                sys.exit()
+            if event.type in REDRAW_EVENTS:
+                redraw = True
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
+import STARTUP  # First, so the startup clock covers the other imports
 import pygame
 import sys
 import os
 import random
-from PIL import Image
-
-# Initialize pygame
-pygame.init()
+import argparse
+from TEXTCACHE import get_font, render_text
+from PROFILER import FrameProfiler
+from IDLE import block_high_rate_events, wait_events, REDRAW_EVENTS
+from SCENES import Scene
+from ASSETS import load_atlas
 
 # Constants
 WIDTH, HEIGHT = 600, 700  # Extra height for display area
@@ -13,6 +16,7 @@ GRID_SIZE = 3
 CELL_SIZE = 150
 GRID_MARGIN = 75
 GLYPH_SIZE = 100
+SMALL_GLYPH_SIZE = 30  # In the code display
 BG_COLOR = (30, 30, 40)
 GRID_COLOR = (100, 100, 120)
 SELECTED_COLOR = (100, 180, 255, 150)
@@ -21,9 +25,8 @@ FAIL_COLOR = (255, 100, 100)
 BUTTON_COLOR = (80, 120, 200)
 BUTTON_HOVER_COLOR = (100, 140, 220)
 
-# Create the window
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Glyph Code Unlocker")
+# The window, glyph images and fonts are loaded by init(), not on import
+screen = None
 
 # Glyph definitions with image support
 class Glyph:
@@ -32,59 +35,44 @@ class Glyph:
         self.name = name
         self.image_path = image_path
         self.pygame_image = None
-        self.load_image()
+        self.small_image = None
         
-    def load_image(self):
-        try:
-            # Use PIL to open and resize the image
-            pil_image = Image.open(self.image_path)
-            pil_image = pil_image.resize((GLYPH_SIZE, GLYPH_SIZE))
-            
-            # Convert PIL image to pygame surface
-            mode = pil_image.mode
-            size = pil_image.size
-            data = pil_image.tobytes()
-            
-            self.pygame_image = pygame.image.fromstring(data, size, mode)
-            
-            # Handle transparency for different image formats
-            if mode == 'RGBA':
-                self.pygame_image = self.pygame_image.convert_alpha()
-            else:
-                self.pygame_image = self.pygame_image.convert()
-                self.pygame_image.set_colorkey((255, 255, 255))  # Set white as transparent
-                
-        except Exception as e:
-            print(f"Error loading image {self.image_path}: {e}")
-            # Create a fallback surface with text
-            self.pygame_image = pygame.Surface((GLYPH_SIZE, GLYPH_SIZE), pygame.SRCALPHA)
-            self.pygame_image.fill((80, 80, 100))
-            font = pygame.font.SysFont('Arial', 20)
-            text = font.render(self.name, True, (255, 255, 255))
-            text_rect = text.get_rect(center=(GLYPH_SIZE//2, GLYPH_SIZE//2))
-            self.pygame_image.blit(text, text_rect)
+    def load_images(self, atlas):
+        """Take the glyph at both sizes from the atlas, or placeholders if its image failed to load"""
+        if self.image_path not in atlas.missing:
+            self.pygame_image = atlas.get(self.image_path, (GLYPH_SIZE, GLYPH_SIZE))
+            self.small_image = atlas.get(self.image_path, (SMALL_GLYPH_SIZE, SMALL_GLYPH_SIZE))
+            return
+        
+        # Create a fallback surface with text
+        self.pygame_image = pygame.Surface((GLYPH_SIZE, GLYPH_SIZE), pygame.SRCALPHA)
+        self.pygame_image.fill((80, 80, 100))
+        font = get_font('Arial', 20, sysfont=True)
+        text = render_text(font, self.name, (255, 255, 255))
+        text_rect = text.get_rect(center=(GLYPH_SIZE//2, GLYPH_SIZE//2))
+        self.pygame_image.blit(text, text_rect)
+        self.small_image = pygame.Surface((SMALL_GLYPH_SIZE, SMALL_GLYPH_SIZE), pygame.SRCALPHA)
+        self.small_image.fill((100, 100, 150))
 
-# Define 9 glyphs using the PNG files
-glyphs = [
-    Glyph(0, "barcode", "barcode.png"),
-    Glyph(1, "cassette", "cassette.png"),
-    Glyph(2, "eject", "eject.png"),
-    Glyph(3, "film", "film.png"),
-    Glyph(4, "games", "games.png"),
-    Glyph(5, "play", "play-button-arrowhead.png"),
-    Glyph(6, "rewind", "rewind-sign.png"),
-    Glyph(7, "stop", "stop-button.png"),
-    Glyph(8, "vhs", "vhs.png")
-]
+def load_glyph_atlas(cache=True):
+    """Every glyph image at both sizes, decoded once (or read from the cache) into one atlas"""
+    return load_atlas("glyphs", [image_path for id, name, image_path in GLYPH_FILES],
+                      [(GLYPH_SIZE, GLYPH_SIZE), (SMALL_GLYPH_SIZE, SMALL_GLYPH_SIZE)], cache)
 
-# Place glyphs on the grid
-grid = []
-for i in range(GRID_SIZE):
-    row = []
-    for j in range(GRID_SIZE):
-        index = i * GRID_SIZE + j
-        row.append(glyphs[index])
-    grid.append(row)
+# The 9 glyphs, using the PNG files
+GLYPH_FILES = [
+    (0, "barcode", "barcode.png"),
+    (1, "cassette", "cassette.png"),
+    (2, "eject", "eject.png"),
+    (3, "film", "film.png"),
+    (4, "games", "games.png"),
+    (5, "play", "play-button-arrowhead.png"),
+    (6, "rewind", "rewind-sign.png"),
+    (7, "stop", "stop-button.png"),
+    (8, "vhs", "vhs.png")
+]
+glyphs = []
+grid = []  # Rows of glyphs as placed on the grid
 
 # Generate random code at startup (3 symbols long)
 correct_code = random.sample(range(9), 3)
@@ -93,34 +81,11 @@ input_active = False
 show_button = True
 show_code = False  # Hide the code by default, only show when 'P' is pressed
 
-# Create small versions of glyph images for the code display
+# Small versions of the glyph images for the code display, by glyph id
 small_glyph_images = {}
-for glyph in glyphs:
-    try:
-        pil_image = Image.open(glyph.image_path)
-        pil_image = pil_image.resize((30, 30))
-        
-        mode = pil_image.mode
-        size = pil_image.size
-        data = pil_image.tobytes()
-        
-        small_image = pygame.image.fromstring(data, size, mode)
-        if mode == 'RGBA':
-            small_image = small_image.convert_alpha()
-        else:
-            small_image = small_image.convert()
-            small_image.set_colorkey((255, 255, 255))  # Set white as transparent
-            
-        small_glyph_images[glyph.id] = small_image
-    except Exception as e:
-        print(f"Error creating small image for {glyph.image_path}: {e}")
-        small_glyph_images[glyph.id] = pygame.Surface((30, 30), pygame.SRCALPHA)
-        small_glyph_images[glyph.id].fill((100, 100, 150))
 
 # Font setup
-font = pygame.font.SysFont('Arial', 30)
-small_font = pygame.font.SysFont('Arial', 20)
-button_font = pygame.font.SysFont('Arial', 24)
+font = small_font = button_font = None
 
 # Button properties
 start_button = pygame.Rect(WIDTH//2 - 100, GRID_MARGIN + CELL_SIZE*GRID_SIZE + 30, 200, 50)
@@ -133,10 +98,37 @@ code_box = pygame.Rect(WIDTH - 150, 20, 130, 50)
 def get_code_symbols():
     return [next(g for g in glyphs if g.id == glyph_id) for glyph_id in correct_code]
 
-code_symbols = get_code_symbols()
+code_symbols = []
 message = "Press 'P' to reveal the access code"
 code_status = None
 
+def init():
+    """Initialize pygame, open the window and load the glyphs and fonts"""
+    global screen, glyphs, grid, small_glyph_images, font, small_font, button_font, code_symbols
+    if screen is None:
+        pygame.init()
+        STARTUP.mark("pygame.init")
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        pygame.display.set_caption("Glyph Code Unlocker")
+        STARTUP.mark("display")
+    if glyphs:
+        return screen
+    
+    atlas = load_glyph_atlas()
+    glyphs = [Glyph(id, name, image_path) for id, name, image_path in GLYPH_FILES]
+    for glyph in glyphs:
+        glyph.load_images(atlas)
+    grid = [glyphs[row * GRID_SIZE:(row + 1) * GRID_SIZE] for row in range(GRID_SIZE)]
+    small_glyph_images = {glyph.id: glyph.small_image for glyph in glyphs}
+    code_symbols = get_code_symbols()
+    STARTUP.mark("glyphs")
+    
+    font = get_font('Arial', 30, sysfont=True)
+    small_font = get_font('Arial', 20, sysfont=True)
+    button_font = get_font('Arial', 24, sysfont=True)
+    STARTUP.mark("fonts")
+    return screen
+
 def draw_grid():
     for row in range(GRID_SIZE):
         for col in range(GRID_SIZE):
@@ -156,12 +148,12 @@ def draw_grid():
 def draw_current_code():
     # Draw current code entry
     code_text = "Current Code: "
-    text = font.render(code_text, True, (220, 220, 220))
+    text = render_text(font, code_text, (220, 220, 220))
     screen.blit(text, (GRID_MARGIN, HEIGHT - 100))
     
     # Draw the glyph images for the current code
     if len(current_code) == 0:
-        text = font.render("None", True, (220, 220, 220))
+        text = render_text(font, "None", (220, 220, 220))
         screen.blit(text, (GRID_MARGIN + text.get_width() + 10, HEIGHT - 100))
     else:
         for i, glyph_id in enumerate(current_code):
@@ -182,7 +174,7 @@ def draw_message():
     elif not show_code and input_active:
         display_message = "Enter your 3-symbol code"
         
-    text = font.render(display_message, True, color)
+    text = render_text(font, display_message, color)
     screen.blit(text, (GRID_MARGIN, HEIGHT - 150))
 
 def draw_code_box():
@@ -195,7 +187,7 @@ def draw_code_box():
     pygame.draw.rect(screen, (100, 100, 130), code_box, 2, border_radius=5)
     
     # Draw title
-    title = small_font.render("Access Code:", True, (200, 200, 200))
+    title = render_text(small_font, "Access Code:", (200, 200, 200))
     screen.blit(title, (code_box.x + 10, code_box.y + 5))
     
     # Draw code images
@@ -215,7 +207,7 @@ def draw_button():
     pygame.draw.rect(screen, (255, 255, 255), start_button, 2, border_radius=8)
     
     # Draw the button text
-    text = button_font.render(button_text, True, (255, 255, 255))
+    text = render_text(button_font, button_text, (255, 255, 255))
     text_rect = text.get_rect(center=start_button.center)
     screen.blit(text, text_rect)
 
@@ -260,18 +252,59 @@ def toggle_code_visibility():
     else:
         message = "Access code hidden. Press 'P' to reveal."
 
-# Main game loop
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
+def draw_screen():
+    # Clear the screen
+    screen.fill(BG_COLOR)
+    
+    # Draw elements
+    draw_grid()
+    draw_current_code()
+    draw_message()
+    draw_button()
+    draw_code_box()  # This will only draw if show_code is True
+    
+    # Draw instruction text
+    if input_active:
+        status = f"Entering code: {len(current_code)}/{len(correct_code)} symbols"
+    elif show_button:
+        status = "Press the button to begin"
+    else:
+        status = "Press 'R' to reset and try again"
+    
+    instructions = render_text(font, status, (180, 180, 180))
+    screen.blit(instructions, (GRID_MARGIN, HEIGHT - 50))
+
+class GlyphLockScene(Scene):
+    """The glyph lock as a scene, for the launcher and for main()"""
+    title = "Glyph Code Unlocker"
+    size = (WIDTH, HEIGHT)
+    idle = True
+    
+    def __init__(self):
+        self.hovered = False  # Whether the start button was drawn hovered
+    
+    @property
+    def hover(self):
+        # Mouse motion only matters for the start button's hover color, so
+        # it is let through just while the button is shown
+        return show_button
+    
+    def enter(self, surface):
+        global screen
+        screen = surface
+        init()
+    
+    def handle_event(self, event):
+        """Returns True when the event changed what is on screen"""
+        if event.type == pygame.MOUSEMOTION:
+            return show_button and start_button.collidepoint(event.pos) != self.hovered
         
-        elif event.type == pygame.MOUSEBUTTONDOWN:
+        if event.type == pygame.MOUSEBUTTONDOWN:
             # Check if the button was clicked
             if show_button and start_button.collidepoint(event.pos):
                 if not input_active:
                     start_code_entry()
+                    return True
             
             # Check if a grid cell was clicked during active input
             elif input_active:
@@ -291,39 +324,83 @@ while running:
                         # Check code if we have the correct number of glyphs
                         if len(current_code) == len(correct_code):
                             verify_code()
+                        return True
+            return False
         
-        elif event.type == pygame.KEYDOWN:
+        if event.type == pygame.KEYDOWN:
             # Reset on R key
             if event.key == pygame.K_r:
                 reset_code()
+                return True
             # Toggle code visibility on P key
             elif event.key == pygame.K_p:
                 toggle_code_visibility()
+                return True
+        return False
     
-    # Clear the screen
-    screen.fill(BG_COLOR)
-    
-    # Draw elements
-    draw_grid()
-    draw_current_code()
-    draw_message()
-    draw_button()
-    draw_code_box()  # This will only draw if show_code is True
+    def draw(self, surface):
+        self.hovered = start_button.collidepoint(pygame.mouse.get_pos())
+        draw_screen()
+
+# Main game loop
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Glyph Code Unlocker")
+    parser.add_argument('--profile', action='store_true',
+                        help='start with the frame profiler overlay shown (toggle with F3)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='write per-frame phase timings as a Chrome trace')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print how long each startup step took once the first frame is shown')
+    args = parser.parse_args(argv)
     
-    # Draw instruction text
-    if input_active:
-        status = f"Entering code: {len(current_code)}/{len(correct_code)} symbols"
-    elif show_button:
-        status = "Press the button to begin"
-    else:
-        status = "Press 'R' to reset and try again"
+    STARTUP.mark("imports")
+    scene = GlyphLockScene()
+    scene.enter(init())
+    profiler = FrameProfiler(args.trace, args.profile)
+    phase = profiler.phase
     
-    instructions = font.render(status, True, (180, 180, 180))
-    screen.blit(instructions, (GRID_MARGIN, HEIGHT - 50))
+    # Sleep until input arrives and redraw only when it changed something
+    redraw = True
+    running = True
+    while running:
+        block_high_rate_events(hover=scene.hover)
+        events = wait_events()
+        profiler.begin_frame()
+        with phase("input"):
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+                
+                elif event.type in REDRAW_EVENTS:
+                    redraw = True
+                
+                elif scene.handle_event(event):
+                    redraw = True
+                
+                elif profiler.handle_event(event):
+                    redraw = True
+        
+        if not redraw:
+            profiler.end_frame()
+            continue
+        redraw = False
+        with phase("draw"):
+            scene.draw(screen)
+            profiler.draw(screen)
+        
+        # Update the display
+        with phase("display.flip"):
+            pygame.display.flip()
+        if args.startup_report:
+            STARTUP.mark("first frame")
+            STARTUP.report()
+            args.startup_report = False
+        profiler.end_frame()
     
-    # Update the display
-    pygame.display.flip()
+    # Quit the game
+    profiler.close()
+    pygame.quit()
+    sys.exit()
 
-# Quit the game
-pygame.quit()
-sys.exit()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
\ No newline at end of file
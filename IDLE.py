@@ -0,0 +1,30 @@
+import pygame
+
+# Event helpers for loops that only redraw when something changed, used by
+# GRID and GRIDtest. Instead of polling at a fixed frame rate, the loop
+# sleeps in wait_events() until input arrives, so an untouched window costs
+# next to no CPU. High-rate events nothing reacts to are blocked so they
+# don't wake the loop; MOUSEMOTION is let through only while a hover
+# effect is on screen.
+
+IDLE_TIMEOUT = 1000  # Longest sleep in ms before the loop wakes up anyway
+HIGH_RATE_EVENTS = [pygame.MOUSEMOTION, pygame.FINGERMOTION, pygame.JOYAXISMOTION,
+                    pygame.JOYBALLMOTION, pygame.JOYHATMOTION]
+# Events after which the window has to be painted again
+REDRAW_EVENTS = {pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWSHOWN,
+                 pygame.WINDOWRESTORED, pygame.WINDOWMAXIMIZED, pygame.WINDOWSIZECHANGED}
+
+def block_high_rate_events(hover=False):
+    """Keep high-rate events out of the queue, except MOUSEMOTION when hover is set"""
+    pygame.event.set_blocked(HIGH_RATE_EVENTS)
+    if hover:
+        pygame.event.set_allowed(pygame.MOUSEMOTION)
+
+def wait_events(timeout=IDLE_TIMEOUT):
+    """Sleep until an event arrives or timeout ms pass; returns every queued event"""
+    event = pygame.event.wait(timeout)
+    if event.type == pygame.NOEVENT:
+        return []
+    events = [event]
+    events.extend(pygame.event.get())
+    return events
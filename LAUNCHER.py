@@ -0,0 +1,146 @@
+import STARTUP  # First, so the startup clock covers the other imports
+import pygame
+import sys
+import argparse
+from TEXTCACHE import get_font, render_text, clear_cache
+from ASSETS import get_image, clear_cache as clear_image_cache
+from SCENES import Scene, SceneManager
+import AUDIO
+import GRID
+import GRIDtest
+import GRID2
+import PONG2
+
+# One window for every game. The menu starts each game as a scene in the
+# same process, so switching is instant and the window, fonts, images and
+# sounds are loaded once and shared. Escape goes back to the menu, where
+# the game stays paused until it is picked again; Escape in the menu quits.
+
+MENU_WIDTH, MENU_HEIGHT = 1024, 576  # The size of OLDWINDOWS.png
+BACKGROUND_IMAGE = "OLDWINDOWS.png"
+ICON_IMAGE = "games.png"
+ICON_SIZE = 40
+ROW_HEIGHT = 56
+PANEL_WIDTH = 440
+TITLE_BAR_HEIGHT = 28
+
+# Windows 95 style colors, to match the background
+SILVER = (192, 192, 192)
+GRAY = (128, 128, 128)
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+NAVY = (0, 0, 128)
+
+# Scene name and menu label of every game, in menu order
+GAMES = [
+    ("grid", "Minesweeper Code Lock"),
+    ("gridtest", "Glyph Code Unlocker"),
+    ("grid2", "Minesweeper"),
+    ("pong2", "PONG 2: Electric Boogaloo"),
+]
+
+class MenuScene(Scene):
+    """Game picker drawn over the OLDWINDOWS.png desktop; click a game or press its number"""
+    title = "OBELISKS"
+    size = (MENU_WIDTH, MENU_HEIGHT)
+    idle = True
+    hover = True  # Rows light up under the mouse
+
+    def __init__(self, games=GAMES):
+        self.games = games
+        height = TITLE_BAR_HEIGHT + ROW_HEIGHT * len(games) + 40
+        self.panel = pygame.Rect(0, 0, PANEL_WIDTH, height)
+        self.panel.center = (MENU_WIDTH // 2, MENU_HEIGHT // 2)
+        top = self.panel.top + TITLE_BAR_HEIGHT + 6
+        self.rows = [pygame.Rect(self.panel.left + 6, top + i * ROW_HEIGHT, PANEL_WIDTH - 12, ROW_HEIGHT)
+                     for i in range(len(games))]
+        self.hovered = -1  # Row under the mouse, -1 for none
+
+    def row_at(self, position):
+        return pygame.Rect(position, (1, 1)).collidelist(self.rows)
+
+    def enter(self, screen):
+        self.hovered = self.row_at(pygame.mouse.get_pos())
+
+    def start(self, index):
+        self.next_scene = self.games[index][0]
+        self.finished = True
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEMOTION:
+            hovered = self.row_at(event.pos)
+            if hovered == self.hovered:
+                return False
+            self.hovered = hovered
+            return True
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            index = self.row_at(event.pos)
+            if index != -1:
+                self.start(index)
+        elif event.type == pygame.KEYDOWN and pygame.K_1 <= event.key < pygame.K_1 + len(self.games):
+            self.start(event.key - pygame.K_1)
+        return False
+
+    def draw(self, surface):
+        font = get_font('Arial', 22, sysfont=True)
+        title_font = get_font('Arial', 18, bold=True, sysfont=True)
+        small_font = get_font('Arial', 15, sysfont=True)
+        surface.blit(get_image(BACKGROUND_IMAGE, (MENU_WIDTH, MENU_HEIGHT)), (0, 0))
+
+        # Raised window with a title bar
+        panel = self.panel
+        pygame.draw.rect(surface, SILVER, panel)
+        pygame.draw.line(surface, WHITE, panel.topleft, (panel.right - 1, panel.top), 2)
+        pygame.draw.line(surface, WHITE, panel.topleft, (panel.left, panel.bottom - 1), 2)
+        pygame.draw.line(surface, GRAY, (panel.left, panel.bottom - 1), (panel.right - 1, panel.bottom - 1), 2)
+        pygame.draw.line(surface, GRAY, (panel.right - 1, panel.top), (panel.right - 1, panel.bottom - 1), 2)
+        title_bar = pygame.Rect(panel.left + 3, panel.top + 3, panel.width - 6, TITLE_BAR_HEIGHT - 3)
+        pygame.draw.rect(surface, NAVY, title_bar)
+        title = render_text(title_font, "OBELISKS", WHITE)
+        surface.blit(title, title.get_rect(midleft=(title_bar.left + 8, title_bar.centery)))
+
+        # One row per game, highlighted under the mouse
+        icon = get_image(ICON_IMAGE, (ICON_SIZE, ICON_SIZE))
+        for index, ((name, label), row) in enumerate(zip(self.games, self.rows)):
+            color = BLACK
+            if index == self.hovered:
+                pygame.draw.rect(surface, NAVY, row)
+                color = WHITE
+            surface.blit(icon, icon.get_rect(midleft=(row.left + 8, row.centery)))
+            text = render_text(font, f"{index + 1}  {label}", color)
+            surface.blit(text, text.get_rect(midleft=(row.left + ICON_SIZE + 20, row.centery)))
+
+        hint = render_text(small_font, "Esc returns here from a game, or quits from here", GRAY)
+        surface.blit(hint, hint.get_rect(midbottom=(panel.centerx, panel.bottom - 8)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OBELISKS game launcher")
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print how long each startup step took once the first frame is shown')
+    args = parser.parse_args(argv)
+    STARTUP.mark("imports")
+
+    AUDIO.pre_init()
+    pygame.init()
+    STARTUP.mark("pygame.init")
+    scenes = {
+        "menu": MenuScene(),
+        "grid": GRID.CodeLockScene(),
+        "gridtest": GRIDtest.GlyphLockScene(),
+        "grid2": GRID2.MinesweeperScene(),
+        "pong2": PONG2.PongScene(),
+    }
+    manager = SceneManager(scenes, "menu")
+
+    def first_frame():
+        STARTUP.mark("first frame")
+        STARTUP.report()
+
+    manager.run(first_frame if args.startup_report else None)
+    clear_cache()
+    clear_image_cache()
+    pygame.quit()
+    sys.exit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import random
+
+try:
+    import numpy as np
+except ImportError:  # Small boards are generated in plain Python without NumPy
+    np = None
+
+# Minesweeper board generation for the GRID code lock. Mines are placed at
+# random and every cell's hint, the number of mines among its eight
+# neighbors, comes from one 3x3 box-filter convolution over the whole
+# mine mask, done as two separable passes of shifted array sums. A
+# 1000x1000 board takes a few milliseconds.
+
+MINE_DENSITY = 0.15  # Share of cells holding a mine, about classic intermediate
+# Symbol names by neighbor count, as drawn by GRID.MinesweeperCodeLock
+HINT_SYMBOLS = ['blank', 'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight']
+MINE_SYMBOL = 'mine'
+
+def mine_count_for(cells, density=MINE_DENSITY):
+    return max(1, round(cells * density))
+
+def place_mines(rows, cols, mines, seed=None):
+    """Boolean (rows, cols) array with mines cells set, chosen at random"""
+    if not 0 <= mines <= rows * cols:
+        raise ValueError("more mines than cells")
+    rng = np.random.default_rng(seed)
+    mask = np.zeros(rows * cols, dtype=bool)
+    mask[rng.choice(rows * cols, mines, replace=False)] = True
+    return mask.reshape(rows, cols)
+
+def neighbor_counts(mask):
+    """Mines among each cell's eight neighbors, as a uint8 array shaped like mask"""
+    padded = np.pad(mask.astype(np.uint8), 1)
+    # Sum each 3x3 window: first down the rows, then across the columns
+    rows = padded[:-2] + padded[1:-1] + padded[2:]
+    box = rows[:, :-2] + rows[:, 1:-1] + rows[:, 2:]
+    return box - mask
+
+def generate_board(rows, cols, mines=None, seed=None):
+    """(mine mask, neighbor counts) of a random rows x cols board"""
+    if mines is None:
+        mines = mine_count_for(rows * cols)
+    mask = place_mines(rows, cols, mines, seed)
+    return mask, neighbor_counts(mask)
+
+def board_symbols(mask, counts):
+    """Flat row-major list of every cell's symbol name"""
+    names = np.array(HINT_SYMBOLS + [MINE_SYMBOL])
+    return names[np.where(mask, len(HINT_SYMBOLS), counts)].ravel().tolist()
+
+def random_board_symbols(size, mines=None, seed=None):
+    """Symbol names of a random size x size board, with or without NumPy"""
+    if mines is None:
+        mines = mine_count_for(size * size)
+    if np is not None:
+        return board_symbols(*generate_board(size, size, mines, seed))
+
+    placed = set(random.Random(seed).sample(range(size * size), mines))
+    symbols = []
+    for row in range(size):
+        for col in range(size):
+            if row * size + col in placed:
+                symbols.append(MINE_SYMBOL)
+                continue
+            count = sum((r * size + c) in placed
+                        for r in range(max(row - 1, 0), min(row + 2, size))
+                        for c in range(max(col - 1, 0), min(col + 2, size)))
+            symbols.append(HINT_SYMBOLS[count])
+    return symbols
@@ -0,0 +1,421 @@
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import time
+import struct
+import asyncio
+import argparse
+import pygame
+from pygame.locals import *
+import PONG2
+from REPLAY import write_varint
+from TEXTCACHE import clear_cache
+
+# Two-machine PONG2 over UDP. The server owns the only PongSimulation and
+# steps it at 60 Hz with the latest input bitmask from each client. Every
+# tick each client gets a snapshot of the game, delta-encoded against the
+# last snapshot it acknowledged; clients draw the game a few ticks in the
+# past, interpolating between snapshots to hide network jitter.
+#
+#   python NETPLAY.py server --port 50007
+#   python NETPLAY.py client localhost --port 50007   (once per player)
+#
+# Packets (little endian):
+#   JOIN      type                                        client -> server
+#   WELCOME   type, player (0 when the game is full)      server -> client
+#   INPUT     type, input sequence, acked tick, bits      client -> server
+#   SNAPSHOT  type, tick, base tick, value count, changed-value bitmask,
+#             zigzag varint difference from the base of every changed value
+#
+# A snapshot is a flat list of ints (see snapshot_values). Base tick 0 means
+# the differences are against all zeros, i.e. a full snapshot.
+
+DEFAULT_PORT = 50007
+JOIN, WELCOME, INPUT, SNAPSHOT = 1, 2, 3, 4
+PACKET_TYPE = struct.Struct("<B")
+WELCOME_PACKET = struct.Struct("<BB")
+INPUT_PACKET = struct.Struct("<BIIB")
+SNAPSHOT_HEADER = struct.Struct("<BIIH")
+
+POSITION_SCALE = 4  # Positions are sent in quarter pixels
+HISTORY_TICKS = 64  # Snapshots kept on both ends to delta against
+CLIENT_TIMEOUT = 5.0  # Seconds of silence before a player's slot is freed
+INTERPOLATION_TICKS = 3  # How far behind the newest snapshot clients draw
+TELEPORT_DISTANCE = 100 * POSITION_SCALE  # Larger jumps are not interpolated
+
+# Snapshot layout: fixed fields, then 3 values per ball and per powerup
+FIELDS = ("time", "score1", "score2", "paddle1_y", "paddle1_height",
+          "paddle2_y", "paddle2_height", "ball_count", "powerup_count")
+STACKS_START = len(FIELDS)
+BALLS_START = STACKS_START + len(PONG2.powerup_types)
+
+# Which player's bits of an input bitmask a client controls
+PLAYER_BITS = {1: PONG2.INPUT_P1_UP | PONG2.INPUT_P1_DOWN, 2: PONG2.INPUT_P2_UP | PONG2.INPUT_P2_DOWN}
+
+def snapshot_values(sim):
+    """The game state a client draws, as a flat list of ints"""
+    x, y, dx, dy, size = sim.balls.kinematics()
+    powerups = [powerup for powerup in sim.powerups if not powerup.collected]
+    values = [int(sim.time), sim.score_player1, sim.score_player2,
+              sim.player1.y, sim.player1.height, sim.player2.y, sim.player2.height,
+              len(x), len(powerups)]
+    values.extend(sim.powerup_stacks[powerup_type["name"]] for powerup_type in PONG2.powerup_types)
+    for ball in zip(x, y, size):
+        values.append(round(float(ball[0]) * POSITION_SCALE))
+        values.append(round(float(ball[1]) * POSITION_SCALE))
+        values.append(int(ball[2]))
+    for powerup in powerups:
+        values.extend((powerup.rect.x, powerup.rect.y, sim.powerup_types.index(powerup.type)))
+    return values
+
+def encode_snapshot(tick, base_tick, values, base):
+    count = len(values)
+    mask = bytearray((count + 7) // 8)
+    body = bytearray()
+    base_count = len(base)
+    for i, value in enumerate(values):
+        difference = value - (base[i] if i < base_count else 0)
+        if difference:
+            mask[i >> 3] |= 1 << (i & 7)
+            write_varint(body, difference * 2 if difference >= 0 else -difference * 2 - 1)
+    return SNAPSHOT_HEADER.pack(SNAPSHOT, tick, base_tick, count) + mask + body
+
+def decode_snapshot(packet, snapshots):
+    """(tick, values) of a snapshot packet, or None if its base is unknown"""
+    _, tick, base_tick, count = SNAPSHOT_HEADER.unpack_from(packet)
+    if base_tick:
+        base = snapshots.get(base_tick)
+        if base is None:
+            return None
+    else:
+        base = ()
+    base_count = len(base)
+    mask_start = SNAPSHOT_HEADER.size
+    i = mask_start + (count + 7) // 8
+    values = []
+    for index in range(count):
+        value = base[index] if index < base_count else 0
+        if packet[mask_start + (index >> 3)] & (1 << (index & 7)):
+            encoded = shift = 0
+            while True:
+                byte = packet[i]
+                i += 1
+                encoded |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            value += encoded >> 1 if not encoded & 1 else -((encoded + 1) >> 1)
+        values.append(value)
+    return tick, values
+
+def drop_old_snapshots(snapshots, latest_tick):
+    """Forget every snapshot HISTORY_TICKS or more ticks older than latest_tick"""
+    # Every old tick, not just the one that fell out: with packet loss or
+    # reordering the ticks in the history are not consecutive
+    oldest = latest_tick - HISTORY_TICKS
+    for tick in [tick for tick in snapshots if tick <= oldest]:
+        del snapshots[tick]
+
+def interpolate(old, new, fraction):
+    # Blend paddle and ball positions when both snapshots have the same layout
+    if old[7:9] != new[7:9]:
+        return new
+    values = list(new)
+    for i in (3, 5):
+        values[i] = old[i] + (new[i] - old[i]) * fraction
+    for i in range(BALLS_START, BALLS_START + 3 * new[7], 3):
+        for j in (i, i + 1):
+            if abs(new[j] - old[j]) < TELEPORT_DISTANCE:
+                values[j] = old[j] + (new[j] - old[j]) * fraction
+    return values
+
+class SnapshotView:
+    """Just enough of a PongSimulation for PONG2.draw_game, refilled from each snapshot's values.
+    
+    The client keeps one view for the whole match; its balls and powerups
+    are pooled, so drawing a frame allocates no game objects.
+    """
+    def __init__(self):
+        self.time = 0
+        self.score_player1 = self.score_player2 = 0
+        self.player1 = pygame.Rect(50, 0, PONG2.PADDLE_WIDTH, PONG2.PADDLE_HEIGHT)
+        self.player2 = pygame.Rect(PONG2.WIDTH - 50 - PONG2.PADDLE_WIDTH, 0, PONG2.PADDLE_WIDTH, PONG2.PADDLE_HEIGHT)
+        self.powerup_stacks = {powerup_type["name"]: 0 for powerup_type in PONG2.powerup_types}
+        self.balls = PONG2.BallList()
+        self.powerups = []
+        self.powerup_pool = []  # Every Powerup made so far; the first len(powerups) are shown
+    
+    def update(self, values):
+        self.time = values[0]
+        self.score_player1, self.score_player2 = values[1], values[2]
+        self.player1.y, self.player1.height = round(values[3]), values[4]
+        self.player2.y, self.player2.height = round(values[5]), values[6]
+        for i, powerup_type in enumerate(PONG2.powerup_types):
+            self.powerup_stacks[powerup_type["name"]] = values[STACKS_START + i]
+        balls = self.balls
+        while balls:
+            balls.swap_remove(len(balls) - 1)  # Back to the pool for add() below
+        i = BALLS_START
+        for _ in range(values[7]):
+            balls.add(values[i] / POSITION_SCALE, values[i + 1] / POSITION_SCALE, 0, 0, values[i + 2])
+            i += 3
+        count = values[8]
+        while len(self.powerup_pool) < count:
+            self.powerup_pool.append(PONG2.Powerup())
+        del self.powerups[count:]
+        for index in range(count):
+            powerup = self.powerup_pool[index]
+            powerup.rect.topleft = (values[i], values[i + 1])
+            powerup.type = PONG2.powerup_types[values[i + 2]]
+            if index < len(self.powerups):
+                self.powerups[index] = powerup
+            else:
+                self.powerups.append(powerup)
+            i += 3
+
+class ClientSlot:
+    def __init__(self, address, player):
+        self.address = address
+        self.player = player
+        self.bits = 0
+        self.sequence = 0
+        self.acked_tick = 0
+        self.last_seen = time.monotonic()
+
+class ServerProtocol(asyncio.DatagramProtocol):
+    """Authoritative PONG2 server: steps the game and sends every player snapshots"""
+    def __init__(self, sim, ai_fill=False):
+        self.sim = sim
+        self.ai_fill = ai_fill
+        self.ais = {}
+        self.slots = {}  # Address -> ClientSlot
+        self.history = {}  # Snapshot tick -> snapshot values
+        self.tick_number = 0  # Snapshot ticks keep counting while the game waits for players
+        self.transport = None
+        self.bytes_sent = 0
+        self.packets_sent = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, address):
+        if not data:
+            return
+        kind = data[0]
+        slot = self.slots.get(address)
+        if kind == JOIN:
+            if slot is None:
+                taken = {slot.player for slot in self.slots.values()}
+                player = next((player for player in (1, 2) if player not in taken), 0)
+                if player:
+                    slot = self.slots[address] = ClientSlot(address, player)
+                    print(f"Player {player} joined from {address[0]}:{address[1]}")
+            self.transport.sendto(WELCOME_PACKET.pack(WELCOME, slot.player if slot else 0), address)
+        elif kind == INPUT and slot is not None and len(data) == INPUT_PACKET.size:
+            _, sequence, acked_tick, bits = INPUT_PACKET.unpack(data)
+            slot.last_seen = time.monotonic()
+            if sequence > slot.sequence:  # Drop late, reordered inputs
+                slot.sequence = sequence
+                slot.bits = bits & PLAYER_BITS[slot.player]
+            if acked_tick > slot.acked_tick:
+                slot.acked_tick = acked_tick
+
+    def drop_silent_clients(self):
+        now = time.monotonic()
+        for address, slot in list(self.slots.items()):
+            if now - slot.last_seen > CLIENT_TIMEOUT:
+                del self.slots[address]
+                print(f"Player {slot.player} timed out")
+
+    def tick(self):
+        sim = self.sim
+        players = {slot.player: slot for slot in self.slots.values()}
+        if self.ai_fill:
+            for player in (1, 2):
+                if player not in players and player not in self.ais:
+                    self.ais[player] = PONG2.InterceptAI(sim, player)
+        if all(player in players or player in self.ais for player in (1, 2)):
+            bits = 0
+            for slot in players.values():
+                bits |= slot.bits
+            p1_move, p2_move = PONG2.input_moves(bits)
+            if 1 not in players:
+                p1_move = self.ais[1].move()
+            if 2 not in players:
+                p2_move = self.ais[2].move()
+            sim.step(p1_move, p2_move)
+
+        # Ticks start at 1 so that base tick 0 can mean "no base"
+        self.tick_number += 1
+        tick = self.tick_number
+        values = snapshot_values(sim)
+        self.history[tick] = values
+        drop_old_snapshots(self.history, tick)
+        for slot in self.slots.values():
+            base = self.history.get(slot.acked_tick)
+            base_tick = slot.acked_tick if base is not None else 0
+            packet = encode_snapshot(tick, base_tick, values, base or ())
+            self.transport.sendto(packet, slot.address)
+            self.bytes_sent += len(packet)
+            self.packets_sent += 1
+
+async def serve(host, port, sim, ai_fill=False):
+    loop = asyncio.get_running_loop()
+    transport, server = await loop.create_datagram_endpoint(
+        lambda: ServerProtocol(sim, ai_fill), local_addr=(host, port))
+    print(f"PONG2 server listening on {host}:{port}")
+    try:
+        next_tick = loop.time()
+        reported = loop.time()
+        while True:
+            server.tick()
+            if loop.time() - reported >= 5:
+                if server.packets_sent:
+                    print(f"{server.packets_sent / (loop.time() - reported):.0f} packets/s, "
+                          f"{server.bytes_sent / server.packets_sent:.0f} bytes/packet")
+                server.bytes_sent = server.packets_sent = 0
+                reported = loop.time()
+                server.drop_silent_clients()
+            # Fixed rate: sleep to the next tick boundary instead of a fixed delay
+            next_tick += sim.dt
+            delay = next_tick - loop.time()
+            if delay < -0.25:
+                next_tick = loop.time()  # Too far behind, don't try to catch up
+            await asyncio.sleep(max(delay, 0))
+    finally:
+        transport.close()
+
+class ClientProtocol(asyncio.DatagramProtocol):
+    """Receives snapshots and tracks where the server's clock is"""
+    def __init__(self):
+        self.transport = None
+        self.player = None
+        self.joined = None
+        self.snapshots = {}  # Tick -> snapshot values
+        self.latest_tick = 0
+        self.clock_offset = None  # Local time minus server time of the earliest-arriving snapshots
+        self.dt = 1.0 / PONG2.FPS
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.joined = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data, address):
+        if not data:
+            return
+        if data[0] == WELCOME and len(data) == WELCOME_PACKET.size:
+            if not self.joined.done():
+                self.joined.set_result(WELCOME_PACKET.unpack(data)[1])
+        elif data[0] == SNAPSHOT and len(data) >= SNAPSHOT_HEADER.size:
+            decoded = decode_snapshot(data, self.snapshots)
+            if decoded is None:
+                return
+            tick, values = decoded
+            self.snapshots[tick] = values
+            self.latest_tick = max(self.latest_tick, tick)
+            drop_old_snapshots(self.snapshots, self.latest_tick)
+
+            # Follow the least delayed packets; drift upwards only slowly so
+            # one late packet does not shift the whole timeline
+            offset = time.monotonic() - tick * self.dt
+            if self.clock_offset is None or offset < self.clock_offset:
+                self.clock_offset = offset
+            else:
+                self.clock_offset += (offset - self.clock_offset) * 0.01
+
+    def send_input(self, sequence, bits):
+        self.transport.sendto(INPUT_PACKET.pack(INPUT, sequence, self.latest_tick, bits))
+
+    def render_values(self):
+        """Interpolated snapshot values to draw now, or None before the first snapshot"""
+        if not self.latest_tick:
+            return None
+        render_tick = (time.monotonic() - self.clock_offset) / self.dt - INTERPOLATION_TICKS
+        older = int(render_tick)
+        old, new = self.snapshots.get(older), self.snapshots.get(older + 1)
+        if old is not None and new is not None:
+            return interpolate(old, new, render_tick - older)
+        # Missing snapshots: show the newest one not after render_tick
+        for tick in range(min(older, self.latest_tick), self.latest_tick - HISTORY_TICKS, -1):
+            if tick in self.snapshots:
+                return self.snapshots[tick]
+        return self.snapshots[self.latest_tick]
+
+async def play(host, port):
+    loop = asyncio.get_running_loop()
+    transport, client = await loop.create_datagram_endpoint(ClientProtocol, remote_addr=(host, port))
+    try:
+        # Keep knocking until the server answers
+        player = None
+        while player is None:
+            transport.sendto(PACKET_TYPE.pack(JOIN))
+            try:
+                player = await asyncio.wait_for(asyncio.shield(client.joined), 1.0)
+            except asyncio.TimeoutError:
+                print(f"Waiting for {host}:{port}...")
+        if not player:
+            print("The game is full")
+            return
+
+        pygame.init()
+        screen = pygame.display.set_mode((PONG2.WIDTH, PONG2.HEIGHT))
+        pygame.display.set_caption(f'PONG 2: ELECTRIC BOOGALOO - Player {player}')
+        font = pygame.font.Font(None, 36)
+        view = SnapshotView()
+        sequence = 0
+        next_frame = loop.time()
+        running = True
+        while running:
+            for event in pygame.event.get():
+                if event.type == QUIT:
+                    running = False
+
+            # Either control scheme moves this client's paddle
+            keys = pygame.key.get_pressed()
+            move = (keys[K_s] or keys[K_DOWN]) - (keys[K_w] or keys[K_UP])
+            sequence += 1
+            client.send_input(sequence, PONG2.input_bits(move if player == 1 else 0, move if player == 2 else 0))
+
+            values = client.render_values()
+            if values is None:
+                screen.fill(PONG2.BLACK)
+                text = font.render("Waiting for the server...", True, PONG2.WHITE)
+                screen.blit(text, text.get_rect(center=screen.get_rect().center))
+            else:
+                view.update(values)
+                PONG2.draw_game(screen, view)
+            pygame.display.flip()
+
+            next_frame += 1.0 / PONG2.FPS
+            await asyncio.sleep(max(next_frame - loop.time(), 0))
+    finally:
+        transport.close()
+        clear_cache()
+        pygame.quit()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='PONG2 over the network.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    server = commands.add_parser('server', help='run the authoritative game server')
+    server.add_argument('--host', default='0.0.0.0')
+    server.add_argument('--port', type=int, default=DEFAULT_PORT)
+    server.add_argument('--seed', type=int, help='random seed for the match')
+    server.add_argument('--numpy', action='store_true', help='use the NumPy ball store')
+    server.add_argument('--ai', action='store_true',
+                        help='let the computer play any empty player slot')
+    client = commands.add_parser('client', help='join a server as the next free player')
+    client.add_argument('host')
+    client.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'server':
+            sim = PONG2.PongSimulation(seed=args.seed, numpy_balls=args.numpy)
+            asyncio.run(serve(args.host, args.port, sim, args.ai))
+        else:
+            asyncio.run(play(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
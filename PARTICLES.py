@@ -0,0 +1,162 @@
+import math
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # The particle system needs NumPy; games run without effects
+    np = None
+
+# Array-backed particle effects for PONG2: hit sparks, goal bursts and
+# powerup pickup puffs. Positions, velocities and lifetimes live in
+# preallocated NumPy arrays that are moved and culled in bulk, and every
+# live particle is drawn with one Surface.blits() call from sprites
+# pre-rendered per color and fade step.
+#
+# The budget is hard: the arrays never grow. As they fill, new bursts are
+# thinned in proportion to the space left, so a screen full of Multi-Ball
+# hits gets sparser effects instead of a slower frame.
+#
+# draw() reports one dirty rect per DIRTY_CELL_SIZE square the particles
+# touch, bounding the particles in it, rather than one per particle, so a
+# burst doesn't push PONG2's DirtyRenderer past its rect limit into
+# full-screen redraws.
+
+MAX_PARTICLES = 2048
+FADE_STEPS = 8  # Pre-rendered alpha levels per color
+SPRITE_SIZE = 4
+DRAG = 0.05  # Fraction of its speed a particle keeps after one second
+DIRTY_CELL_SIZE = 128  # A 1000x700 window has at most 48 cells
+
+# Burst shapes: particles per source, speed in px/s and lifetime in seconds
+HIT_SPARKS = (10, 240, 0.35)
+GOAL_BURST = (60, 420, 0.9)
+PICKUP_PUFF = (30, 180, 0.6)
+SPARK_COLOR = (255, 255, 160)
+GOAL_COLOR = (255, 255, 255)
+
+class ParticleSystem:
+    """Fixed-budget particles updated with NumPy and drawn with one blits() call"""
+    def __init__(self, budget=MAX_PARTICLES, seed=None):
+        if np is None:
+            raise RuntimeError("The particle system needs NumPy installed")
+        self.budget = budget
+        self.count = 0
+        self.x = np.zeros(budget)
+        self.y = np.zeros(budget)
+        self.dx = np.zeros(budget)
+        self.dy = np.zeros(budget)
+        self.life = np.zeros(budget)  # Seconds left
+        self.max_life = np.ones(budget)
+        self.color = np.zeros(budget, dtype=np.intp)  # Index into the palette
+        self.palette = {}  # Color -> palette index
+        self.sprites = []  # FADE_STEPS sprites per palette color, faintest first
+        self.rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return self.count
+
+    def color_index(self, color):
+        index = self.palette.get(color)
+        if index is None:
+            index = self.palette[color] = len(self.palette)
+            for step in range(FADE_STEPS):
+                sprite = pygame.Surface((SPRITE_SIZE, SPRITE_SIZE), pygame.SRCALPHA)
+                sprite.fill((*color, 255 * (step + 1) // FADE_STEPS))
+                self.sprites.append(sprite)
+        return index
+
+    def emit(self, xs, ys, per_source, speed, life, color):
+        """Spray per_source particles from every (xs[i], ys[i]) source"""
+        free = self.budget - self.count
+        wanted = len(xs) * per_source
+        allowed = min(free, math.ceil(wanted * free / self.budget))
+        if allowed <= 0:
+            return
+        # Thin evenly across sources, so every source keeps some particles
+        picked = np.arange(allowed) * wanted // allowed // per_source
+        start, end = self.count, self.count + allowed
+        self.x[start:end] = np.asarray(xs, dtype=float)[picked]
+        self.y[start:end] = np.asarray(ys, dtype=float)[picked]
+        angles = self.rng.uniform(0, 2 * math.pi, allowed)
+        speeds = self.rng.uniform(0.3, 1.0, allowed) * speed
+        self.dx[start:end] = np.cos(angles) * speeds
+        self.dy[start:end] = np.sin(angles) * speeds
+        lives = self.rng.uniform(0.5, 1.0, allowed) * life
+        self.life[start:end] = lives
+        self.max_life[start:end] = lives
+        self.color[start:end] = self.color_index(color)
+        self.count = end
+
+    def emit_events(self, events, powerup_colors):
+        """Effects for a PongSimulation step's events; powerup_colors maps powerup names to colors"""
+        hit_xs = []
+        hit_ys = []
+        for event in events:
+            kind = event[0]
+            if kind == "hit":
+                hit_xs.append(event[1])
+                hit_ys.append(event[2])
+            elif kind == "goal":
+                self.emit((event[2],), (event[3],), *GOAL_BURST, GOAL_COLOR)
+            elif kind == "pickup":
+                self.emit((event[2],), (event[3],), *PICKUP_PUFF, powerup_colors[event[1]])
+        if hit_xs:
+            self.emit(hit_xs, hit_ys, *HIT_SPARKS, SPARK_COLOR)
+
+    def update(self, dt):
+        """Advance every particle by dt seconds and drop the dead ones"""
+        n = self.count
+        if not n:
+            return
+        x, y, dx, dy, life = self.x[:n], self.y[:n], self.dx[:n], self.dy[:n], self.life[:n]
+        x += dx * dt
+        y += dy * dt
+        drag = DRAG ** dt
+        dx *= drag
+        dy *= drag
+        life -= dt
+        alive = life > 0
+        if not alive.all():
+            keep = np.flatnonzero(alive)
+            for array in (self.x, self.y, self.dx, self.dy, self.life, self.max_life, self.color):
+                array[:keep.size] = array[keep]
+            self.count = keep.size
+
+    def draw(self, surface):
+        """Blit every live particle; returns a few rects that cover them all"""
+        n = self.count
+        if not n:
+            return []
+        fade = (self.life[:n] * FADE_STEPS / self.max_life[:n]).astype(np.intp)
+        np.minimum(fade, FADE_STEPS - 1, out=fade)
+        sprites = self.color[:n] * FADE_STEPS + fade
+        half = SPRITE_SIZE // 2
+        lefts = (self.x[:n] - half).astype(int)
+        tops = (self.y[:n] - half).astype(int)
+        surface.blits(zip(map(self.sprites.__getitem__, sprites.tolist()), zip(lefts.tolist(), tops.tolist())),
+                      doreturn=False)
+        return dirty_rects(lefts, tops, surface.get_rect())
+
+    def clear(self):
+        self.count = 0
+
+def dirty_rects(lefts, tops, bounds):
+    """Bounding rects of the sprites at lefts, tops, one per DIRTY_CELL_SIZE cell, clipped to bounds"""
+    width, height = bounds.size
+    # Sprites off the surface are clamped to its edge; their clipped rect is empty and dropped
+    columns = np.clip(lefts, 0, width - 1) // DIRTY_CELL_SIZE
+    rows = np.clip(tops, 0, height - 1) // DIRTY_CELL_SIZE
+    cells = rows * (width // DIRTY_CELL_SIZE + 1) + columns
+    order = np.argsort(cells, kind="stable")
+    cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, cells[1:] != cells[:-1]])
+    lefts, tops = lefts[order], tops[order]
+    rects = []
+    for left, top, right, bottom in zip(np.minimum.reduceat(lefts, starts).tolist(),
+                                        np.minimum.reduceat(tops, starts).tolist(),
+                                        np.maximum.reduceat(lefts, starts).tolist(),
+                                        np.maximum.reduceat(tops, starts).tolist()):
+        rect = pygame.Rect(left, top, right - left + SPRITE_SIZE, bottom - top + SPRITE_SIZE).clip(bounds)
+        if rect:
+            rects.append(rect)
+    return rects
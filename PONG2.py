@@ -1,11 +1,27 @@
+import STARTUP  # First, so the startup clock covers the other imports
 import pygame
 import sys
 import random
 import math
+import argparse
+import itertools
+import collections
+import heapq
+import struct
+import time
+import zlib
 from pygame.locals import *
+from TEXTCACHE import get_font, render_text, clear_cache
+from REPLAY import ReplayRecorder, load_replay, iter_inputs, MAX_SEED
+from PROFILER import FrameProfiler, null_phase
+import AUDIO
+from PARTICLES import ParticleSystem
+from SCENES import Scene
 
-# Initialize Pygame
-pygame.init()
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for the array ball store
+    np = None
 
 # Constants - adjusted for fast gameplay
 WIDTH, HEIGHT = 1000, 700
@@ -22,401 +38,1514 @@ PURPLE = (255, 0, 255)
 ORANGE = (255, 165, 0)
 CYAN = (0, 255, 255)
 FPS = 60
+# Input bitmask bits, one set of four per tick in replays and netplay
+INPUT_P1_UP = 1
+INPUT_P1_DOWN = 2
+INPUT_P2_UP = 4
+INPUT_P2_DOWN = 8
+HASH_CELL_SIZE = 32  # Spatial hash cell, about twice the normal ball size
+MAX_BOUNCES = 8  # Wall and paddle bounces resolved per ball per tick
+# Objects created up front, so a normal match never grows its pools mid-game
+BALL_POOL_SIZE = 32
+POWERUP_POOL_SIZE = 8
+# Rendering between physics steps
+TELEPORT_DISTANCE = WIDTH / 4  # Moves longer than this in one step (serves, resets) aren't interpolated
+MAX_FRAME_TIME = 0.25  # Seconds of physics caught up after a stall; the rest is dropped
 
 # Game variables
 base_ball_speed = 7  # Higher default speed for more exciting gameplay
 paddle_speed = 9  # Slightly faster paddles to match ball speed
-score_player1 = 0
-score_player2 = 0
 powerup_duration = 7000  # 7 seconds for powerups
 
-# Create the screen
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('PONG 2: ELECTRIC BOOGALOO')
-clock = pygame.time.Clock()
-font = pygame.font.Font(None, 36)
+# Powerup definitions
+powerup_types = [
+    {"name": "Big Ball", "color": RED, "duration": powerup_duration, "stack_limit": 3},
+    {"name": "Speed Boost", "color": GREEN, "duration": powerup_duration, "stack_limit": 3},
+    {"name": "Paddle Growth", "color": BLUE, "duration": powerup_duration, "stack_limit": 3},
+    {"name": "Multi-Ball", "color": ORANGE, "duration": powerup_duration, "stack_limit": 3},  # Added multi-ball
+    {"name": "Paddle Speed", "color": CYAN, "duration": powerup_duration, "stack_limit": 3}   # Added paddle speed boost
+]
 
-# Create game objects
-player1 = pygame.Rect(50, HEIGHT // 2 - PADDLE_HEIGHT // 2, PADDLE_WIDTH, PADDLE_HEIGHT)
-player2 = pygame.Rect(WIDTH - 50 - PADDLE_WIDTH, HEIGHT // 2 - PADDLE_HEIGHT // 2, PADDLE_WIDTH, PADDLE_HEIGHT)
+# Powerup effects, called with the new and previous stack level whenever a
+# powerup stacks up or a stack expires. Each one recomputes its derived value
+# from the level instead of undoing earlier changes one by one.
+def big_ball_effect(sim, level, previous_level):
+    # Increase ball size for all balls
+    sim.ball_size = int(sim.original_ball_size * 1.3 ** level)  # Exponential scaling
+    sim.balls.set_size(sim.ball_size)
+
+def speed_boost_effect(sim, level, previous_level):
+    sim.speed_factor = 1.2 ** level
+    if level == 0:
+        # Reset ball speeds to base speed but preserve direction
+        sim.balls.set_speed(sim.base_ball_speed)
+    else:
+        sim.balls.scale_speed(1.2 ** (level - previous_level))
+
+def paddle_growth_effect(sim, level, previous_level):
+    paddle_height = int(sim.original_paddle_height * 1.25 ** level)
+    sim.player1.height = paddle_height
+    sim.player2.height = paddle_height
+
+def multi_ball_effect(sim, level, previous_level):
+    if level > previous_level:
+        # Add more balls based on stack level (1 extra at level 1, 2 at level 2, 4 at level 3)
+        sim.spawn_extra_balls(2 ** (level - 1))
+    elif level == 0:
+        # Remove extra balls, keeping only the first one
+        sim.balls.keep_primary()
+
+def paddle_speed_effect(sim, level, previous_level):
+    sim.paddle_speed = int(sim.original_paddle_speed * 1.25 ** level)
+
+powerup_effects = {
+    "Big Ball": big_ball_effect,
+    "Speed Boost": speed_boost_effect,
+    "Paddle Growth": paddle_growth_effect,
+    "Multi-Ball": multi_ball_effect,
+    "Paddle Speed": paddle_speed_effect
+}
+
+def paddle_bounce(paddle, center_y, dx, dy, direction):
+    """New (dx, dy) for a ball leaving paddle in direction (1 = right, -1 = left)"""
+    speed = math.hypot(abs(dx) * 1.05, dy)  # Slight speed increase on hits
+    
+    # Add bounce angle variation
+    relative_intersect_y = (paddle.y + paddle.height / 2) - center_y
+    normalized_relative_intersect_y = relative_intersect_y / (paddle.height / 2)
+    bounce_angle = normalized_relative_intersect_y * (math.pi / 3)  # Wider angle range (60°)
+    return direction * speed * math.cos(bounce_angle), -speed * math.sin(bounce_angle)
+
+def lerp(previous, current, alpha):
+    # Position drawn a fraction alpha of the way through the last step
+    if abs(current - previous) > TELEPORT_DISTANCE:
+        return current
+    return previous + (current - previous) * alpha
+
+def input_bits(p1_move, p2_move):
+    """Pack both paddle moves (-1 up, 0 or 1 down) into an input bitmask"""
+    bits = 0
+    if p1_move < 0:
+        bits |= INPUT_P1_UP
+    elif p1_move > 0:
+        bits |= INPUT_P1_DOWN
+    if p2_move < 0:
+        bits |= INPUT_P2_UP
+    elif p2_move > 0:
+        bits |= INPUT_P2_DOWN
+    return bits
+
+def input_moves(bits):
+    """Inverse of input_bits"""
+    p1_move = bool(bits & INPUT_P1_DOWN) - bool(bits & INPUT_P1_UP)
+    p2_move = bool(bits & INPUT_P2_DOWN) - bool(bits & INPUT_P2_UP)
+    return p1_move, p2_move
 
 # Ball class for multiple ball powerup
 class Ball:
-    def __init__(self, x=None, y=None, dx=None, dy=None, size=BALL_SIZE):
-        if x is None:
-            x = WIDTH // 2 - size // 2
-        if y is None:
-            y = HEIGHT // 2 - size // 2
-        
+    __slots__ = ("x", "y", "rect", "size", "dx", "dy")
+    
+    def __init__(self, x, y, dx, dy, size=BALL_SIZE):
+        self.x = x  # Exact position; rect is the rounded copy used for drawing
+        self.y = y
         self.rect = pygame.Rect(x, y, size, size)
         self.size = size
+        self.dx = dx
+        self.dy = dy
+    
+    def reset(self, x, y, dx, dy, size=BALL_SIZE):
+        # Reinitialize in place, for balls reused from a pool
+        self.x = x
+        self.y = y
+        self.rect.update(x, y, size, size)
+        self.size = size
+        self.dx = dx
+        self.dy = dy
+    
+    def update(self, step, paddle1, paddle2, events=None):
+        """Move the ball through step frames (velocities are in pixels per 60 FPS frame).
         
-        if dx is None or dy is None:
-            angle = random.uniform(-math.pi/4, math.pi/4)
-            direction = random.choice([-1, 1])
-            self.dx = direction * base_ball_speed * math.cos(angle)
-            self.dy = base_ball_speed * math.sin(angle)
-        else:
-            self.dx = dx
-            self.dy = dy
+        Movement is swept: each wall or paddle face the ball would reach this
+        tick is hit at its exact time of impact and the rest of the tick
+        continues from the bounce, so fast balls cannot tunnel through paddles.
+        Paddle hits are appended to events as ("hit", x, y).
+        """
+        x, y, dx, dy, size = self.x, self.y, self.dx, self.dy, self.size
+        remaining = step
+        for _ in range(MAX_BOUNCES):
+            hit_time = remaining
+            hit = None
             
-    def update(self):
-        # Update position
-        self.rect.x += self.dx
-        self.rect.y += self.dy
-        
-        # Wall collisions
-        if self.rect.top <= 0 or self.rect.bottom >= HEIGHT:
-            self.dy = -self.dy
+            # Wall collisions
+            if dy < 0:
+                t = max(-y / dy, 0)
+                if t < hit_time:
+                    hit_time, hit = t, "wall"
+            elif dy > 0:
+                t = max((HEIGHT - size - y) / dy, 0)
+                if t < hit_time:
+                    hit_time, hit = t, "wall"
             
+            # Paddle faces (while the ball is still in front of them) and goal lines
+            if dx < 0:
+                if x + size / 2 > paddle1.centerx:
+                    t = max((paddle1.right - x) / dx, 0)
+                    hit_y = y + dy * t
+                    if t < hit_time and hit_y < paddle1.bottom and hit_y + size > paddle1.top:
+                        hit_time, hit = t, paddle1
+                t = max(-x / dx, 0)
+                if t < hit_time:
+                    hit_time, hit = t, "goal"
+            elif dx > 0:
+                if x + size / 2 < paddle2.centerx:
+                    t = max((paddle2.left - size - x) / dx, 0)
+                    hit_y = y + dy * t
+                    if t < hit_time and hit_y < paddle2.bottom and hit_y + size > paddle2.top:
+                        hit_time, hit = t, paddle2
+                t = max((WIDTH - size - x) / dx, 0)
+                if t < hit_time:
+                    hit_time, hit = t, "goal"
+            
+            x += dx * hit_time
+            y += dy * hit_time
+            remaining -= hit_time
+            if hit == "goal":
+                # Land exactly on the line; rounding can leave x a hair short of it
+                x = 0 if dx < 0 else WIDTH - size
+                break
+            if hit is None:
+                break
+            if hit == "wall":
+                dy = -dy
+            else:
+                if hit is paddle1:
+                    x = paddle1.right
+                    dx, dy = paddle_bounce(paddle1, y + size / 2, dx, dy, 1)
+                else:
+                    x = paddle2.left - size
+                    dx, dy = paddle_bounce(paddle2, y + size / 2, dx, dy, -1)
+                if events is not None:
+                    events.append(("hit", x + size / 2, y + size / 2))
+        
+        self.x, self.y, self.dx, self.dy = x, y, dx, dy
+        self.rect.topleft = (x, y)
+        
         # Check if out of bounds (scoring)
-        if self.rect.left <= 0:
+        if x <= 0:
             return "right_score"
-        elif self.rect.right >= WIDTH:
+        elif x + size >= WIDTH:
             return "left_score"
         
         return None
     
     def check_paddle_collision(self, paddle1, paddle2):
+        # Catches paddles that moved into the ball, which the sweep cannot see
         if self.rect.colliderect(paddle1):
             self.rect.left = paddle1.right + 1  # Prevent sticking
-            self.dx = abs(self.dx) * 1.05  # Slight speed increase on hits
-            
-            # Add bounce angle variation
-            relative_intersect_y = (paddle1.y + paddle1.height / 2) - self.rect.centery
-            normalized_relative_intersect_y = relative_intersect_y / (paddle1.height / 2)
-            bounce_angle = normalized_relative_intersect_y * (math.pi / 3)  # Wider angle range (60°)
-            speed = math.sqrt(self.dx * self.dx + self.dy * self.dy)
-            self.dx = speed * math.cos(bounce_angle)
-            self.dy = -speed * math.sin(bounce_angle)
-            
+            self.x = self.rect.x
+            self.dx, self.dy = paddle_bounce(paddle1, self.rect.centery, self.dx, self.dy, 1)
             return True
             
         elif self.rect.colliderect(paddle2):
             self.rect.right = paddle2.left - 1  # Prevent sticking
-            self.dx = -abs(self.dx) * 1.05  # Slight speed increase on hits
-            
-            # Add bounce angle variation
-            relative_intersect_y = (paddle2.y + paddle2.height / 2) - self.rect.centery
-            normalized_relative_intersect_y = relative_intersect_y / (paddle2.height / 2)
-            bounce_angle = normalized_relative_intersect_y * (math.pi / 3)  # Wider angle range (60°)
-            speed = math.sqrt(self.dx * self.dx + self.dy * self.dy)
-            self.dx = -speed * math.cos(bounce_angle)
-            self.dy = -speed * math.sin(bounce_angle)
-            
+            self.x = self.rect.x
+            self.dx, self.dy = paddle_bounce(paddle2, self.rect.centery, self.dx, self.dy, -1)
             return True
             
         return False
     
-    def draw(self):
-        pygame.draw.rect(screen, WHITE, self.rect)
+    def draw(self, surface):
+        pygame.draw.rect(surface, WHITE, self.rect)
 
-# Initialize primary ball
-balls = [Ball()]
+class BallList(list):
+    """Multi-Ball store of Ball objects, updated one ball at a time.
+    
+    Removed balls go to a pool that add() reuses, so Multi-Ball pickups and
+    scoring extra balls don't allocate once the pool has grown.
+    """
+    def __init__(self, pool_size=BALL_POOL_SIZE):
+        super().__init__()
+        self.pool = [Ball(0, 0, 0, 0) for _ in range(pool_size)]
+        self.previous = []  # x and y of every ball before the last step, flattened
+        self.draw_rect = pygame.Rect(0, 0, 0, 0)
+    
+    def add(self, x, y, dx, dy, size=BALL_SIZE):
+        if self.pool:
+            ball = self.pool.pop()
+            ball.reset(x, y, dx, dy, size)
+        else:
+            ball = Ball(x, y, dx, dy, size)
+        self.append(ball)
+    
+    def reset_primary(self, x, y, dx, dy, size=BALL_SIZE):
+        self[0].reset(x, y, dx, dy, size)
+    
+    def swap_remove(self, index):
+        # O(1) removal: the last ball takes the removed ball's place
+        ball = self[index]
+        last = self.pop()
+        if index < len(self):
+            self[index] = last
+        self.pool.append(ball)
+    
+    def center(self, index):
+        return self[index].rect.center
+    
+    def size_of(self, index):
+        return self[index].size
+    
+    def set_size(self, size):
+        for ball in self:
+            ball.size = size
+            ball.rect.width = size
+            ball.rect.height = size
+    
+    def scale_speed(self, factor):
+        for ball in self:
+            ball.dx *= factor
+            ball.dy *= factor
+    
+    def set_speed(self, speed):
+        # Change every ball's speed but preserve its direction
+        for ball in self:
+            current_speed = math.sqrt(ball.dx*ball.dx + ball.dy*ball.dy)
+            ball.dx = ball.dx / current_speed * speed
+            ball.dy = ball.dy / current_speed * speed
+    
+    def keep_primary(self):
+        while len(self) > 1:
+            self.pool.append(self.pop())
+    
+    def hits(self, index, rect):
+        return self[index].rect.colliderect(rect)
+    
+    def collide(self, pairs):
+        # Bounce overlapping balls off each other like equal-mass discs
+        for i, j in pairs:
+            ball1, ball2 = self[i], self[j]
+            if not ball1.rect.colliderect(ball2.rect):
+                continue
+            
+            # Collision normal between the two centers
+            normal_x = ball2.rect.centerx - ball1.rect.centerx
+            normal_y = ball2.rect.centery - ball1.rect.centery
+            distance = math.hypot(normal_x, normal_y)
+            if distance == 0:
+                continue
+            normal_x /= distance
+            normal_y /= distance
+            
+            # Skip pairs that are already moving apart
+            approach = (ball1.dx - ball2.dx) * normal_x + (ball1.dy - ball2.dy) * normal_y
+            if approach <= 0:
+                continue
+            
+            # Equal masses swap their velocity components along the normal
+            ball1.dx -= approach * normal_x
+            ball1.dy -= approach * normal_y
+            ball2.dx += approach * normal_x
+            ball2.dy += approach * normal_y
+    
+    def save_positions(self):
+        previous = self.previous
+        previous.clear()
+        for ball in self:
+            previous.append(ball.x)
+            previous.append(ball.y)
+    
+    def interpolates(self, alpha):
+        # Balls added or removed in the last step change indices, so those
+        # frames are drawn as stepped
+        return alpha < 1.0 and len(self.previous) == 2 * len(self)
+    
+    def rects(self, alpha=1.0):
+        if not self.interpolates(alpha):
+            return [ball.rect.copy() for ball in self]
+        previous = self.previous
+        return [pygame.Rect(lerp(previous[2 * i], ball.x, alpha), lerp(previous[2 * i + 1], ball.y, alpha),
+                            ball.size, ball.size) for i, ball in enumerate(self)]
+    
+    def kinematics(self):
+        # x, y, dx, dy and size of every ball, as arrays when NumPy is around
+        values = [(ball.x, ball.y, ball.dx, ball.dy, ball.size) for ball in self]
+        if np is not None:
+            return np.array(values, dtype=float).reshape(-1, 5).T
+        return [list(column) for column in zip(*values)] or [[]] * 5
+    
+    def state_bytes(self):
+        values = []
+        for ball in self:
+            values.extend((ball.x, ball.y, ball.dx, ball.dy, ball.size))
+        return struct.pack(f"<{len(values)}d", *values)
+    
+    def add_to_grid(self, grid):
+        for index, ball in enumerate(self):
+            grid.insert(index, ball.rect.x, ball.rect.y, ball.size, ball.size)
+    
+    def update(self, step, paddle1, paddle2, respawn=False, events=None):
+        """Move every ball and bounce it off walls and paddles.
+        
+        Returns (points for player 1, points for player 2, primary scored).
+        Extra balls that score are removed, or served again from the
+        center line when respawn is set; the primary ball is left for the
+        caller to reset. Paddle hits and goals are appended to events as
+        ("hit", x, y) and ("goal", scoring player, x, y).
+        """
+        points1 = points2 = 0
+        primary_scored = False
+        i = 0
+        while i < len(self):
+            ball = self[i]
+            result = ball.update(step, paddle1, paddle2, events)
+            
+            # Handle scoring
+            if result is not None:
+                player = 2 if result == "right_score" else 1
+                if player == 2:
+                    points2 += 1
+                else:
+                    points1 += 1
+                if events is not None:
+                    events.append(("goal", player, ball.rect.centerx, ball.rect.centery))
+                if i == 0:  # If it's the primary ball
+                    primary_scored = True
+                elif respawn:
+                    # Serve it back from the center line at the same height
+                    ball.x = WIDTH / 2 - ball.size / 2
+                    ball.rect.x = ball.x
+                    ball.dx = -ball.dx
+                else:
+                    # Remove this extra ball; the ball swapped into its
+                    # place has not moved yet, so i stays
+                    self.swap_remove(i)
+                    continue
+            
+            # Check paddle collisions
+            if ball.check_paddle_collision(paddle1, paddle2) and events is not None:
+                events.append(("hit", ball.rect.centerx, ball.rect.centery))
+            i += 1
+        return points1, points2, primary_scored
+    
+    def draw(self, surface, alpha=1.0):
+        if not self.interpolates(alpha):
+            for ball in self:
+                ball.draw(surface)
+            return
+        previous = self.previous
+        rect = self.draw_rect
+        for i, ball in enumerate(self):
+            rect.update(lerp(previous[2 * i], ball.x, alpha), lerp(previous[2 * i + 1], ball.y, alpha),
+                        ball.size, ball.size)
+            pygame.draw.rect(surface, WHITE, rect)
 
-# Powerup related variables
-active_powerups = []
-powerup_types = [
-    {"name": "Big Ball", "color": RED, "duration": powerup_duration, "stack_limit": 3},
-    {"name": "Speed Boost", "color": GREEN, "duration": powerup_duration, "stack_limit": 3},
-    {"name": "Paddle Growth", "color": BLUE, "duration": powerup_duration, "stack_limit": 3},
-    {"name": "Multi-Ball", "color": ORANGE, "duration": powerup_duration, "stack_limit": 3},  # Added multi-ball
-    {"name": "Paddle Speed", "color": CYAN, "duration": powerup_duration, "stack_limit": 3}   # Added paddle speed boost
-]
-powerups = []
-powerup_spawn_timer = 0
-next_powerup_time = random.randint(3000, 6000)  # More frequent powerups (3-6 seconds)
-
-# Track stacking levels for each powerup
-powerup_stacks = {
-    "Big Ball": 0,
-    "Speed Boost": 0,
-    "Paddle Growth": 0,
-    "Multi-Ball": 0,
-    "Paddle Speed": 0
-}
+class BallArray:
+    """Struct-of-arrays Multi-Ball store backed by NumPy.
+    
+    Positions are floats so balls keep sub-pixel precision, and every ball
+    is moved, bounced and scored with batched array operations instead of
+    one Ball object at a time.
+    """
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.dx = np.zeros(capacity)
+        self.dy = np.zeros(capacity)
+        self.size = np.zeros(capacity)
+        self.previous_x = np.zeros(capacity)  # Positions before the last step
+        self.previous_y = np.zeros(capacity)
+        self.previous_count = -1
+        self.sprites = {}  # Ball size -> pre-filled surface used for blitting
+    
+    def __len__(self):
+        return self.count
+    
+    def add(self, x, y, dx, dy, size=BALL_SIZE):
+        if self.count == len(self.x):
+            # Double the capacity so appends stay amortized O(1)
+            for name in ("x", "y", "dx", "dy", "size", "previous_x", "previous_y"):
+                grown = np.zeros(2 * self.count)
+                grown[:self.count] = getattr(self, name)
+                setattr(self, name, grown)
+        i = self.count
+        self.x[i], self.y[i], self.dx[i], self.dy[i], self.size[i] = x, y, dx, dy, size
+        self.count += 1
+    
+    def reset_primary(self, x, y, dx, dy, size=BALL_SIZE):
+        self.x[0], self.y[0], self.dx[0], self.dy[0], self.size[0] = x, y, dx, dy, size
+    
+    def center(self, index):
+        half = self.size[index] / 2
+        return int(self.x[index] + half), int(self.y[index] + half)
+    
+    def size_of(self, index):
+        return int(self.size[index])
+    
+    def set_size(self, size):
+        self.size[:self.count] = size
+    
+    def scale_speed(self, factor):
+        self.dx[:self.count] *= factor
+        self.dy[:self.count] *= factor
+    
+    def set_speed(self, speed):
+        n = self.count
+        scale = speed / np.hypot(self.dx[:n], self.dy[:n])
+        self.dx[:n] *= scale
+        self.dy[:n] *= scale
+    
+    def keep_primary(self):
+        self.count = min(self.count, 1)
+    
+    def overlaps(self, rect):
+        """Boolean mask of the balls overlapping rect."""
+        n = self.count
+        x, y, size = self.x[:n], self.y[:n], self.size[:n]
+        return ((x < rect.right) & (x + size > rect.left) &
+                (y < rect.bottom) & (y + size > rect.top))
+    
+    def hits(self, index, rect):
+        x, y, size = self.x[index], self.y[index], self.size[index]
+        return x < rect.right and x + size > rect.left and y < rect.bottom and y + size > rect.top
+    
+    def collide(self, pairs):
+        """Batched equivalent of BallList.collide.
+        
+        Every candidate pair is resolved at once. A ball touching several
+        others receives the average of their impulses, which keeps dense
+        clusters from gaining energy.
+        """
+        if not pairs:
+            return
+        i, j = np.array(list(pairs)).T
+        x, y, size = self.x, self.y, self.size
+        touching = ((x[i] < x[j] + size[j]) & (x[j] < x[i] + size[i]) &
+                    (y[i] < y[j] + size[j]) & (y[j] < y[i] + size[i]))
+        i, j = i[touching], j[touching]
+        
+        # Collision normals between the centers
+        normal_x = (x[j] + size[j] / 2) - (x[i] + size[i] / 2)
+        normal_y = (y[j] + size[j] / 2) - (y[i] + size[i] / 2)
+        distance = np.hypot(normal_x, normal_y)
+        apart = distance > 0
+        i, j = i[apart], j[apart]
+        normal_x = normal_x[apart] / distance[apart]
+        normal_y = normal_y[apart] / distance[apart]
+        
+        # Only pairs moving toward each other swap their normal components
+        approach = (self.dx[i] - self.dx[j]) * normal_x + (self.dy[i] - self.dy[j]) * normal_y
+        approaching = approach > 0
+        i, j = i[approaching], j[approaching]
+        impulse_x = approach[approaching] * normal_x[approaching]
+        impulse_y = approach[approaching] * normal_y[approaching]
+        contacts = np.bincount(i, minlength=self.count) + np.bincount(j, minlength=self.count)
+        np.subtract.at(self.dx, i, impulse_x / contacts[i])
+        np.subtract.at(self.dy, i, impulse_y / contacts[i])
+        np.add.at(self.dx, j, impulse_x / contacts[j])
+        np.add.at(self.dy, j, impulse_y / contacts[j])
+    
+    def save_positions(self):
+        n = self.count
+        self.previous_x[:n] = self.x[:n]
+        self.previous_y[:n] = self.y[:n]
+        self.previous_count = n
+    
+    def positions(self, alpha=1.0):
+        """x and y of every ball as drawn, a fraction alpha through the last step"""
+        n = self.count
+        x, y = self.x[:n], self.y[:n]
+        if alpha >= 1.0 or self.previous_count != n:
+            return x, y
+        previous_x, previous_y = self.previous_x[:n], self.previous_y[:n]
+        # Balls that jumped (served again or reset) are drawn where they are now
+        still = (np.abs(x - previous_x) <= TELEPORT_DISTANCE) & (np.abs(y - previous_y) <= TELEPORT_DISTANCE)
+        return (np.where(still, previous_x + (x - previous_x) * alpha, x),
+                np.where(still, previous_y + (y - previous_y) * alpha, y))
+    
+    def rects(self, alpha=1.0):
+        x, y = self.positions(alpha)
+        return [pygame.Rect(x, y, size, size) for x, y, size in
+                zip(x.astype(int).tolist(), y.astype(int).tolist(),
+                    self.size[:self.count].astype(int).tolist())]
+    
+    def kinematics(self):
+        n = self.count
+        return self.x[:n], self.y[:n], self.dx[:n], self.dy[:n], self.size[:n]
+    
+    def state_bytes(self):
+        n = self.count
+        return b"".join(array[:n].tobytes() for array in (self.x, self.y, self.dx, self.dy, self.size))
+    
+    def add_to_grid(self, grid):
+        # Cell ranges are computed for every ball at once; only the dict
+        # inserts happen per ball
+        n = self.count
+        cell = grid.cell_size
+        x0 = (self.x[:n] // cell).astype(int)
+        y0 = (self.y[:n] // cell).astype(int)
+        x1 = ((self.x[:n] + self.size[:n]) // cell).astype(int)
+        y1 = ((self.y[:n] + self.size[:n]) // cell).astype(int)
+        grid.insert_cells(range(n), x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist())
+    
+    def bounce_velocity(self, idx, paddle, direction):
+        # Same bounce as paddle_bounce, for the balls at idx
+        speed = np.hypot(np.abs(self.dx[idx]) * 1.05, self.dy[idx])
+        relative_intersect_y = (paddle.y + paddle.height / 2) - (self.y[idx] + self.size[idx] / 2)
+        bounce_angle = relative_intersect_y / (paddle.height / 2) * (math.pi / 3)
+        self.dx[idx] = direction * speed * np.cos(bounce_angle)
+        self.dy[idx] = -speed * np.sin(bounce_angle)
+    
+    def add_events(self, events, idx, kind, *details):
+        # One (kind, *details, x, y) event per ball at idx, at its center
+        if events is None or not idx.size:
+            return
+        half = self.size[idx] / 2
+        for x, y in zip((self.x[idx] + half).tolist(), (self.y[idx] + half).tolist()):
+            events.append((kind, *details, x, y))
+    
+    def bounce(self, hit, paddle, direction, events=None):
+        # Same push-out as Ball.check_paddle_collision, for every ball in hit
+        idx = np.flatnonzero(hit)
+        if not idx.size:
+            return
+        if direction > 0:
+            self.x[idx] = paddle.right + 1  # Prevent sticking
+        else:
+            self.x[idx] = paddle.left - 1 - self.size[idx]
+        self.bounce_velocity(idx, paddle, direction)
+        self.add_events(events, idx, "hit")
+    
+    def sweep(self, step, paddle1, paddle2, events=None):
+        """Batched equivalent of the swept movement in Ball.update.
+        
+        Each round finds every moving ball's earliest wall, paddle or goal
+        impact, advances it there and bounces it; balls that hit nothing
+        (or a goal line) drop out of the next round.
+        """
+        idx = np.arange(self.count)
+        remaining = np.full(self.count, float(step))
+        for _ in range(MAX_BOUNCES):
+            if not idx.size:
+                break
+            x, y, dx, dy, size = self.x[idx], self.y[idx], self.dx[idx], self.dy[idx], self.size[idx]
+            
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t_wall = np.where(dy < 0, -y / dy, np.where(dy > 0, (HEIGHT - size - y) / dy, np.inf))
+                t_goal = np.where(dx < 0, -x / dx, np.where(dx > 0, (WIDTH - size - x) / dx, np.inf))
+                t_paddle1 = np.where((dx < 0) & (x + size / 2 > paddle1.centerx), (paddle1.right - x) / dx, np.inf)
+                t_paddle2 = np.where((dx > 0) & (x + size / 2 < paddle2.centerx), (paddle2.left - size - x) / dx, np.inf)
+                times = np.maximum(np.stack((t_wall, t_paddle1, t_paddle2, t_goal, remaining[idx])), 0)
+                
+                # Paddle faces only count if the ball lines up with them at impact
+                hit_y = y + dy * times[1]
+                times[1][(hit_y >= paddle1.bottom) | (hit_y + size <= paddle1.top)] = np.inf
+                hit_y = y + dy * times[2]
+                times[2][(hit_y >= paddle2.bottom) | (hit_y + size <= paddle2.top)] = np.inf
+            
+            event = times.argmin(axis=0)
+            t = times[event, np.arange(idx.size)]
+            self.x[idx] = x + dx * t
+            self.y[idx] = y + dy * t
+            remaining[idx] -= t
+            
+            walls = idx[event == 0]
+            self.dy[walls] = -self.dy[walls]
+            hit1 = idx[event == 1]
+            self.x[hit1] = paddle1.right
+            self.bounce_velocity(hit1, paddle1, 1)
+            self.add_events(events, hit1, "hit")
+            hit2 = idx[event == 2]
+            self.x[hit2] = paddle2.left - self.size[hit2]
+            self.bounce_velocity(hit2, paddle2, -1)
+            self.add_events(events, hit2, "hit")
+            # Goals land exactly on the line; rounding can leave x a hair short of it
+            goals = idx[event == 3]
+            self.x[goals] = np.where(self.dx[goals] < 0, 0, WIDTH - self.size[goals])
+            
+            # Balls that reached a goal line or the end of the tick are done
+            idx = idx[event < 3]
+    
+    def update(self, step, paddle1, paddle2, respawn=False, events=None):
+        """Batched equivalent of BallList.update."""
+        self.sweep(step, paddle1, paddle2, events)
+        n = self.count
+        x, y, dx, dy, size = self.x[:n], self.y[:n], self.dx[:n], self.dy[:n], self.size[:n]
+        
+        # Scoring
+        left_out = x <= 0
+        right_out = (x + size >= WIDTH) & ~left_out
+        scored = left_out | right_out
+        points1 = int(np.count_nonzero(right_out))
+        points2 = int(np.count_nonzero(left_out))
+        self.add_events(events, np.flatnonzero(right_out), "goal", 1)
+        self.add_events(events, np.flatnonzero(left_out), "goal", 2)
+        
+        # Paddles that moved into a ball
+        hit1 = self.overlaps(paddle1) & ~scored
+        hit2 = self.overlaps(paddle2) & ~scored & ~hit1
+        self.bounce(hit1, paddle1, 1, events)
+        self.bounce(hit2, paddle2, -1, events)
+        
+        primary_scored = bool(n and scored[0])
+        if n:
+            scored[0] = False
+        if respawn:
+            x[scored] = WIDTH / 2 - size[scored] / 2
+            np.negative(dx, out=dx, where=scored)
+        elif scored.any():
+            # Compact the surviving balls to the front of the arrays
+            keep = np.flatnonzero(~scored)
+            for array in (self.x, self.y, self.dx, self.dy, self.size):
+                array[:keep.size] = array[keep]
+            self.count = keep.size
+        return points1, points2, primary_scored
+    
+    def draw(self, surface, alpha=1.0):
+        n = self.count
+        x, y = self.positions(alpha)
+        x, y = x.astype(int), y.astype(int)
+        sizes = self.size[:n].astype(int)
+        for size in np.unique(sizes).tolist():
+            sprite = self.sprites.get(size)
+            if sprite is None:
+                sprite = pygame.Surface((size, size))
+                sprite.fill(WHITE)
+                self.sprites[size] = sprite
+            same = sizes == size
+            positions = zip(x[same].tolist(), y[same].tolist())
+            surface.blits(zip(itertools.repeat(sprite), positions), False)
 
-# Original values for resetting
-original_ball_size = BALL_SIZE
-original_paddle_height = PADDLE_HEIGHT
-original_paddle_speed = paddle_speed
-
-def reset_primary_ball():
-    # Reset only the main ball while keeping any additional balls
-    balls[0] = Ball()
-
-def spawn_powerup():
-    powerup_type = random.choice(powerup_types)
-    powerup = {
-        "rect": pygame.Rect(
-            random.randint(WIDTH // 4, 3 * WIDTH // 4 - POWERUP_SIZE),
-            random.randint(POWERUP_SIZE, HEIGHT - POWERUP_SIZE * 2),
-            POWERUP_SIZE,
-            POWERUP_SIZE
-        ),
-        "type": powerup_type,
-        "collected": False
-    }
-    powerups.append(powerup)
-
-def apply_powerup(powerup_type):
-    global paddle_speed
-    
-    powerup_name = powerup_type["name"]
-    
-    # Check if we've hit the stack limit
-    if powerup_stacks[powerup_name] >= powerup_type["stack_limit"]:
-        # If at stack limit, refresh the duration instead
-        for effect in active_powerups:
-            if effect["type"]["name"] == powerup_name:
-                effect["start_time"] = pygame.time.get_ticks()
-        return
-    
-    # Stack the powerup
-    powerup_stacks[powerup_name] += 1
-    
-    new_effect = {
-        "type": powerup_type,
-        "start_time": pygame.time.get_ticks(),
-        "duration": powerup_type["duration"],
-        "stack_level": powerup_stacks[powerup_name]
-    }
-    active_powerups.append(new_effect)
-    
-    # Apply effect based on the current stack level
-    if powerup_name == "Big Ball":
-        # Increase ball size for all balls
-        scale_factor = 1.3 ** powerup_stacks[powerup_name]  # Exponential scaling
-        new_size = int(original_ball_size * scale_factor)
-        for ball in balls:
-            ball.size = new_size
-            ball.rect.width = new_size
-            ball.rect.height = new_size
-    
-    elif powerup_name == "Speed Boost":
-        # Increase ball speed for all balls
-        speed_factor = 1.2 ** powerup_stacks[powerup_name]
-        for ball in balls:
-            ball.dx *= speed_factor
-            ball.dy *= speed_factor
-    
-    elif powerup_name == "Paddle Growth":
-        # Increase paddle size
-        scale_factor = 1.25 ** powerup_stacks[powerup_name]
-        new_height = int(original_paddle_height * scale_factor)
-        player1.height = new_height
-        player2.height = new_height
-    
-    elif powerup_name == "Multi-Ball":
-        # Add more balls based on stack level (1 extra at level 1, 2 at level 2, 4 at level 3)
-        new_balls_count = 2 ** (powerup_stacks[powerup_name] - 1)
-        for _ in range(new_balls_count):
-            # Create a new ball with random direction
-            existing_ball = random.choice(balls)  # Pick a random existing ball
+class Powerup:
+    """A powerup waiting on the field; pooled by PongSimulation"""
+    __slots__ = ("rect", "type", "collected")
+    
+    def __init__(self):
+        self.rect = pygame.Rect(0, 0, POWERUP_SIZE, POWERUP_SIZE)
+        self.type = None
+        self.collected = False
+
+class PowerupEffect:
+    """One stack of an active powerup; pooled by PongSimulation"""
+    __slots__ = ("type", "start_time", "duration", "stack_level", "expiry_entry")
+
+class SpatialHash:
+    """Uniform grid that buckets items by the cells their rectangles cover.
+    
+    Rebuilt every tick, it narrows collision checks down to items sharing a
+    cell, so the cost grows with the number of items rather than with the
+    number of item pairs.
+    """
+    def __init__(self, cell_size=HASH_CELL_SIZE, width=0, height=0):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> bucket list, kept and reused across rebuilds
+        self.occupied = []  # Buckets holding items since the last clear()
+        
+        # Create the buckets covering width x height up front
+        for cx in range(width // cell_size + 1):
+            for cy in range(height // cell_size + 1):
+                self.cells[(cx, cy)] = []
+    
+    def clear(self):
+        for bucket in self.occupied:
+            bucket.clear()
+        self.occupied.clear()
+    
+    def insert(self, item, x, y, width, height):
+        cell = self.cell_size
+        self.insert_cells((item,), (int(x // cell),), (int(y // cell),),
+                          (int((x + width) // cell),), (int((y + height) // cell),))
+    
+    def insert_cells(self, items, x0s, y0s, x1s, y1s):
+        # Each item covers the inclusive cell range (x0, y0) - (x1, y1)
+        cells = self.cells
+        occupied = self.occupied
+        for item, x0, y0, x1, y1 in zip(items, x0s, y0s, x1s, y1s):
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    bucket = cells.get((cx, cy))
+                    if bucket is None:
+                        bucket = cells[(cx, cy)] = []
+                    if not bucket:
+                        occupied.append(bucket)
+                    bucket.append(item)
+    
+    def query(self, rect):
+        """Items sharing a cell with rect (candidates, not exact hits)."""
+        cell = self.cell_size
+        found = set()
+        for cx in range(rect.left // cell, rect.right // cell + 1):
+            for cy in range(rect.top // cell, rect.bottom // cell + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        return found
+    
+    def pairs(self):
+        """Candidate (i, j) pairs, i < j, of items sharing at least one cell."""
+        found = set()
+        for bucket in self.occupied:
+            if len(bucket) > 1:
+                for a in range(len(bucket) - 1):
+                    i = bucket[a]
+                    for j in bucket[a + 1:]:
+                        found.add((i, j) if i < j else (j, i))
+        return found
+
+class PongSimulation:
+    """All PONG2 game state, advanced in fixed steps of dt seconds.
+    
+    Needs no display: paddle inputs are passed to step() and time is
+    simulated, so matches can be stepped as fast as the CPU allows.
+    """
+    def __init__(self, seed=None, dt=1.0 / FPS, ball_speed=base_ball_speed,
+                 paddle_speed=paddle_speed, powerup_types=powerup_types,
+                 numpy_balls=False, stress_balls=0, ball_collisions=False):
+        if seed is None:
+            seed = random.getrandbits(32)
+        # Everything needed to rebuild this simulation, e.g. for a replay
+        self.settings = {
+            "seed": seed,
+            "dt": dt,
+            "ball_speed": ball_speed,
+            "paddle_speed": paddle_speed,
+            "stress_balls": stress_balls,
+            "numpy_balls": numpy_balls,
+            "ball_collisions": ball_collisions
+        }
+        
+        self.dt = dt
+        self.step_scale = dt * FPS  # Movement per step relative to a 60 FPS frame
+        
+        # Separate seeded streams, so e.g. extra Multi-Ball spawns don't
+        # change where later powerups appear
+        self.ball_rng = random.Random(f"{seed}:balls")
+        self.powerup_rng = random.Random(f"{seed}:powerups")
+        self.time = 0  # Simulated milliseconds since the match started
+        self.ticks = 0
+        
+        # What happened during the last step: ("hit", x, y), ("goal", player, x, y),
+        # ("pickup", powerup name, x, y) and ("expire", powerup name)
+        self.events = []
+        
+        # Times the parts of step(); main() swaps in FrameProfiler.phase
+        self.phase = null_phase
+        
+        self.base_ball_speed = ball_speed
+        self.paddle_speed = paddle_speed
+        self.original_ball_size = BALL_SIZE
+        self.original_paddle_height = PADDLE_HEIGHT
+        self.original_paddle_speed = paddle_speed
+        
+        # Values derived from the active powerup stacks
+        self.ball_size = BALL_SIZE
+        self.speed_factor = 1.0
+        
+        self.score_player1 = 0
+        self.score_player2 = 0
+        
+        # Create game objects
+        self.player1 = pygame.Rect(50, HEIGHT // 2 - PADDLE_HEIGHT // 2, PADDLE_WIDTH, PADDLE_HEIGHT)
+        self.player2 = pygame.Rect(WIDTH - 50 - PADDLE_WIDTH, HEIGHT // 2 - PADDLE_HEIGHT // 2, PADDLE_WIDTH, PADDLE_HEIGHT)
+        # Exact paddle heights; the Rects are rounded from them for collisions and drawing
+        self.player1_y = float(self.player1.y)
+        self.player2_y = float(self.player2.y)
+        # Paddle heights before the last step, for interpolated drawing
+        self.previous_player1_y = self.player1_y
+        self.previous_player2_y = self.player2_y
+        
+        # Initialize primary ball
+        if numpy_balls:
+            if np is None:
+                raise RuntimeError("The NumPy ball store needs NumPy installed")
+            self.balls = BallArray()
+        else:
+            self.balls = BallList()
+        self.add_ball()
+        
+        # Broadphase for powerup pickups and optional ball-to-ball bounces
+        self.ball_grid = SpatialHash(HASH_CELL_SIZE, WIDTH, HEIGHT)
+        self.ball_collisions = ball_collisions
+        
+        # Stress mode scatters its balls, serves scored balls again instead of
+        # removing them and spawns no powerups, so the ball count stays fixed
+        self.stress = stress_balls > 0
+        for _ in range(stress_balls):
+            self.add_ball(self.ball_rng.uniform(WIDTH // 4, 3 * WIDTH // 4),
+                          self.ball_rng.uniform(0, HEIGHT - BALL_SIZE))
+        
+        # Powerup related variables
+        self.powerup_types = powerup_types
+        self.active_powerups = {powerup_type["name"]: [] for powerup_type in powerup_types}
+        self.expiry_queue = []  # Heap of (expiry time, sequence number, effect)
+        self.expiry_sequence = itertools.count()
+        self.powerups = []
+        # Collected powerups and expired effects, reused by later spawns and pickups
+        self.powerup_pool = [Powerup() for _ in range(POWERUP_POOL_SIZE)]
+        self.effect_pool = [PowerupEffect() for powerup_type in powerup_types
+                            for _ in range(powerup_type["stack_limit"])]
+        self.next_powerup_time = self.powerup_rng.randint(3000, 6000)  # More frequent powerups (3-6 seconds)
+        if self.stress:
+            self.next_powerup_time = math.inf
+        
+        # Track stacking levels for each powerup
+        self.powerup_stacks = {powerup_type["name"]: 0 for powerup_type in powerup_types}
+    
+    def random_velocity(self):
+        angle = self.ball_rng.uniform(-math.pi/4, math.pi/4)
+        direction = self.ball_rng.choice([-1, 1])
+        speed = self.base_ball_speed * self.speed_factor
+        return direction * speed * math.cos(angle), speed * math.sin(angle)
+    
+    def add_ball(self, x=None, y=None, size=BALL_SIZE):
+        # New balls start at the center (unless placed) with a random direction
+        if x is None:
+            x = WIDTH // 2 - size // 2
+        if y is None:
+            y = HEIGHT // 2 - size // 2
+        self.balls.add(x, y, *self.random_velocity(), size)
+    
+    def reset_primary_ball(self):
+        # Reset only the main ball while keeping any additional balls
+        dx, dy = self.random_velocity()
+        size = self.ball_size
+        self.balls.reset_primary(WIDTH // 2 - size // 2, HEIGHT // 2 - size // 2, dx, dy, size)
+    
+    def spawn_extra_balls(self, count):
+        for _ in range(count):
+            existing_ball = self.ball_rng.randrange(len(self.balls))  # Pick a random existing ball
+            centerx, centery = self.balls.center(existing_ball)
             # Create a new ball at same position but different angle
-            new_ball = Ball(
-                existing_ball.rect.centerx - BALL_SIZE//2,
-                existing_ball.rect.centery - BALL_SIZE//2,
-                None,  # Random direction
-                None,
-                existing_ball.size  # Same size as source ball
+            self.add_ball(
+                centerx - BALL_SIZE//2,
+                centery - BALL_SIZE//2,
+                self.balls.size_of(existing_ball)  # Same size as source ball
             )
-            balls.append(new_ball)
-    
-    elif powerup_name == "Paddle Speed":
-        # Increase paddle movement speed
-        speed_factor = 1.25 ** powerup_stacks[powerup_name]
-        paddle_speed = int(original_paddle_speed * speed_factor)
-
-def update_powerups():
-    global paddle_speed
-    
-    current_time = pygame.time.get_ticks()
-    
-    # Check for expired powerups
-    expired_powerups = []
-    for effect in active_powerups:
-        if current_time - effect["start_time"] >= effect["duration"]:
-            expired_powerups.append(effect)
-    
-    # Remove expired powerups and revert their effects
-    for effect in expired_powerups:
-        powerup_name = effect["type"]["name"]
-        stack_level = effect["stack_level"]
-        
-        # Reduce stack count
-        powerup_stacks[powerup_name] -= 1
-        
-        # Only revert effects if all stacks of this powerup are gone
-        if powerup_stacks[powerup_name] == 0:
-            if powerup_name == "Big Ball":
-                # Reset ball size
-                for ball in balls:
-                    ball.size = original_ball_size
-                    ball.rect.width = original_ball_size
-                    ball.rect.height = original_ball_size
-            
-            elif powerup_name == "Speed Boost":
-                # Reset ball speeds to base speed but preserve direction
-                for ball in balls:
-                    current_speed = math.sqrt(ball.dx*ball.dx + ball.dy*ball.dy)
-                    direction_x = ball.dx / current_speed
-                    direction_y = ball.dy / current_speed
-                    ball.dx = direction_x * base_ball_speed
-                    ball.dy = direction_y * base_ball_speed
+    
+    def spawn_powerup(self):
+        powerup_type = self.powerup_rng.choice(self.powerup_types)
+        powerup = self.powerup_pool.pop() if self.powerup_pool else Powerup()
+        powerup.rect.topleft = (
+            self.powerup_rng.randint(WIDTH // 4, 3 * WIDTH // 4 - POWERUP_SIZE),
+            self.powerup_rng.randint(POWERUP_SIZE, HEIGHT - POWERUP_SIZE * 2)
+        )
+        powerup.type = powerup_type
+        powerup.collected = False
+        self.powerups.append(powerup)
+    
+    def schedule_expiry(self, effect):
+        # Only the effect's latest queue entry (by sequence number) counts
+        effect.expiry_entry = entry = next(self.expiry_sequence)
+        heapq.heappush(self.expiry_queue, (self.time + effect.duration, entry, effect))
+    
+    def set_stack_level(self, powerup_name, level):
+        previous_level = self.powerup_stacks[powerup_name]
+        self.powerup_stacks[powerup_name] = level
+        powerup_effects[powerup_name](self, level, previous_level)
+    
+    def apply_powerup(self, powerup_type):
+        powerup_name = powerup_type["name"]
+        active = self.active_powerups[powerup_name]
+        
+        # Check if we've hit the stack limit
+        if len(active) >= powerup_type["stack_limit"]:
+            # If at stack limit, refresh the duration instead. The old queue
+            # entries go stale and are skipped when they come due
+            for effect in active:
+                effect.start_time = self.time
+                self.schedule_expiry(effect)
+            return
+        
+        # Stack the powerup. A pooled effect may still have stale queue
+        # entries, but schedule_expiry gives it a newer entry number
+        new_effect = self.effect_pool.pop() if self.effect_pool else PowerupEffect()
+        new_effect.type = powerup_type
+        new_effect.start_time = self.time
+        new_effect.duration = powerup_type["duration"]
+        new_effect.stack_level = len(active) + 1
+        active.append(new_effect)
+        self.schedule_expiry(new_effect)
+        self.set_stack_level(powerup_name, len(active))
+    
+    def update_powerups(self):
+        # Only effects that are due are touched; the heap keeps the next
+        # expiry on top
+        queue = self.expiry_queue
+        while queue and queue[0][0] <= self.time:
+            _, entry, effect = heapq.heappop(queue)
+            if entry != effect.expiry_entry:
+                continue  # Refreshed or reused since this entry was queued
             
-            elif powerup_name == "Paddle Growth":
-                # Reset paddle size
-                player1.height = original_paddle_height
-                player2.height = original_paddle_height
+            # Remove the expired effect and drop its stack
+            powerup_name = effect.type["name"]
+            active = self.active_powerups[powerup_name]
+            index = active.index(effect)
+            active[index] = active[-1]
+            active.pop()
+            effect.expiry_entry = None
+            self.effect_pool.append(effect)
+            self.set_stack_level(powerup_name, len(active))
+            self.events.append(("expire", powerup_name))
+    
+    def collect_powerups(self):
+        # Only balls sharing a grid cell with a powerup get an exact test
+        powerups = self.powerups
+        i = 0
+        while i < len(powerups):
+            powerup = powerups[i]
+            rect = powerup.rect
+            if any(self.balls.hits(index, rect) for index in self.ball_grid.query(rect)):
+                powerup.collected = True
+                self.events.append(("pickup", powerup.type["name"], rect.centerx, rect.centery))
+                self.apply_powerup(powerup.type)
+                # Swap-remove it and keep it for the next spawn
+                last = powerups.pop()
+                if i < len(powerups):
+                    powerups[i] = last
+                self.powerup_pool.append(powerup)
+            else:
+                i += 1
+    
+    def move_paddles(self, p1_move, p2_move):
+        # Moves are -1 (up), 0 or 1 (down). Paddles move in floats, like the
+        # balls, so their speed doesn't depend on rounding at the physics rate
+        distance = self.paddle_speed * self.step_scale
+        player1, player2 = self.player1, self.player2
+        if p1_move:
+            self.player1_y = min(max(self.player1_y + p1_move * distance, 0), HEIGHT - player1.height)
+            player1.y = round(self.player1_y)
+        if p2_move:
+            self.player2_y = min(max(self.player2_y + p2_move * distance, 0), HEIGHT - player2.height)
+            player2.y = round(self.player2_y)
+    
+    def state_checksum(self):
+        """CRC32 of the whole game state, to check that a replay matched exactly"""
+        state = (self.ticks, self.score_player1, self.score_player2,
+                 tuple(self.player1), tuple(self.player2), self.player1_y, self.player2_y,
+                 float(self.paddle_speed),
+                 tuple(self.powerup_stacks.values()), self.next_powerup_time,
+                 [tuple(powerup.rect) for powerup in self.powerups])
+        return zlib.crc32(self.balls.state_bytes(), zlib.crc32(repr(state).encode()))
+    
+    def save_positions(self):
+        """Remember paddle and ball positions, so frames drawn before the next step can interpolate"""
+        self.previous_player1_y = self.player1_y
+        self.previous_player2_y = self.player2_y
+        self.balls.save_positions()
+    
+    def step(self, p1_move=0, p2_move=0):
+        """Advance the match by one tick of dt seconds."""
+        self.ticks += 1
+        self.time = self.ticks * self.dt * 1000
+        self.events.clear()
+        phase = self.phase
+        
+        with phase("paddles"):
+            self.move_paddles(p1_move, p2_move)
+        
+        # Update all balls and handle scoring
+        with phase("balls"):
+            points1, points2, primary_scored = self.balls.update(
+                self.step_scale, self.player1, self.player2, self.stress, self.events)
+            self.score_player1 += points1
+            self.score_player2 += points2
+            if primary_scored:
+                self.reset_primary_ball()
+        
+        with phase("powerups"):
+            # Spawn new powerups more frequently
+            if self.time >= self.next_powerup_time:
+                self.spawn_powerup()
+                # More frequent as game progresses
+                self.next_powerup_time = self.time + self.powerup_rng.randint(2000, 5000)
             
-            elif powerup_name == "Multi-Ball":
-                # Remove extra balls, always keep at least one
-                if len(balls) > 1:
-                    # Keep only the first ball
-                    balls[:] = [balls[0]]
+            # Rebuild the ball grid when something needs to query it
+            if self.ball_collisions or self.powerups:
+                self.ball_grid.clear()
+                self.balls.add_to_grid(self.ball_grid)
+            if self.ball_collisions:
+                self.balls.collide(self.ball_grid.pairs())
             
-            elif powerup_name == "Paddle Speed":
-                # Reset paddle speed
-                paddle_speed = original_paddle_speed
+            # Check for powerup collisions with any ball
+            if self.powerups:
+                self.collect_powerups()
         
-        # Remove the expired effect
-        active_powerups.remove(effect)
+        # Update active powerups
+        with phase("update_powerups"):
+            self.update_powerups()
+
+def fold(position, span):
+    # Where an unbounded coordinate ends up after bouncing between 0 and span;
+    # works on floats and NumPy arrays alike
+    return span - abs(position % (2 * span) - span)
 
-def draw_game():
-    screen.fill(BLACK)
+class InterceptAI:
+    """Computer paddle that moves to where the balls will cross its face.
+    
+    Every tick it predicts, for all balls heading its way at once, the
+    height each one reaches the paddle at (walls included) and goes for
+    the ball that arrives first. It acts on predictions made
+    reaction_delay milliseconds ago and misses each new trajectory by a
+    random offset of standard deviation error pixels.
+    """
+    def __init__(self, sim, player, reaction_delay=0, error=0.0, seed=None):
+        self.sim = sim
+        self.player = player  # 1 (left) or 2 (right)
+        self.paddle = sim.player1 if player == 1 else sim.player2
+        self.error = error
+        if seed is None:
+            seed = f"{sim.settings['seed']}:ai{player}"
+        self.rng = random.Random(seed)
+        self.offset = 0.0
+        # Predictions waiting out the reaction delay, oldest first
+        self.delay_ticks = round(reaction_delay / 1000 / sim.dt)
+        self.pending = collections.deque(maxlen=self.delay_ticks + 1)
+    
+    def target(self):
+        """Ball center height to meet, or None when no ball is coming"""
+        x, y, dx, dy, size = self.sim.balls.kinematics()
+        paddle = self.paddle
+        if np is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if self.player == 1:
+                    t = np.where(dx < 0, (paddle.right - x) / dx, np.inf)
+                else:
+                    t = np.where(dx > 0, (paddle.left - size - x) / dx, np.inf)
+            t[t < 0] = np.inf  # Already past the face
+            if not t.size:
+                return None
+            first = int(t.argmin())
+            time_to_face = t[first]
+        else:
+            first, time_to_face = None, math.inf
+            for i in range(len(x)):
+                if self.player == 1 and dx[i] < 0:
+                    t = (paddle.right - x[i]) / dx[i]
+                elif self.player == 2 and dx[i] > 0:
+                    t = (paddle.left - size[i] - x[i]) / dx[i]
+                else:
+                    continue
+                if 0 <= t < time_to_face:
+                    first, time_to_face = i, t
+        if time_to_face == math.inf:
+            return None
+        return float(fold(y[first] + dy[first] * time_to_face, HEIGHT - size[first]) + size[first] / 2)
     
+    def move(self):
+        """Paddle move for this tick: -1 (up), 0 or 1 (down)"""
+        sim = self.sim
+        if any(event[0] in ("hit", "goal") for event in sim.events):
+            # A bounce or a goal starts a new trajectory to misjudge
+            self.offset = self.rng.gauss(0, self.error) if self.error else 0.0
+        target = self.target()
+        self.pending.append(HEIGHT / 2 if target is None else target + self.offset)
+        target = self.pending[0]
+        
+        # Stop once within half a tick's travel to avoid jittering around the target
+        distance = sim.paddle_speed * sim.step_scale / 2
+        if target < self.paddle.centery - distance:
+            return -1
+        if target > self.paddle.centery + distance:
+            return 1
+        return 0
+
+def paddle_rects(sim, alpha=1.0):
+    if alpha >= 1.0:
+        return sim.player1.copy(), sim.player2.copy()
+    player1 = sim.player1.copy()
+    player2 = sim.player2.copy()
+    player1.y = round(lerp(sim.previous_player1_y, sim.player1_y, alpha))
+    player2.y = round(lerp(sim.previous_player2_y, sim.player2_y, alpha))
+    return player1, player2
+
+def draw_objects(surface, sim, alpha=1.0):
+    # alpha < 1 draws paddles and balls part way through the last step
     # Draw paddles
-    pygame.draw.rect(screen, WHITE, player1)
-    pygame.draw.rect(screen, WHITE, player2)
+    player1, player2 = paddle_rects(sim, alpha)
+    pygame.draw.rect(surface, WHITE, player1)
+    pygame.draw.rect(surface, WHITE, player2)
     
     # Draw all balls
-    for ball in balls:
-        ball.draw()
+    sim.balls.draw(surface, alpha)
     
     # Draw powerups
-    for powerup in powerups:
-        if not powerup["collected"]:
-            pygame.draw.rect(screen, powerup["type"]["color"], powerup["rect"])
+    for powerup in sim.powerups:
+        if not powerup.collected:
+            pygame.draw.rect(surface, powerup.type["color"], powerup.rect)
             # Add a pulsing effect for visibility
-            pulse = int(128 + 127 * math.sin(pygame.time.get_ticks() / 200))
-            pygame.draw.rect(screen, (pulse, pulse, pulse), powerup["rect"], 2)
-    
+            pulse = int(128 + 127 * math.sin(sim.time / 200))
+            pygame.draw.rect(surface, (pulse, pulse, pulse), powerup.rect, 2)
+
+def draw_static(surface):
     # Draw center line
     for y in range(0, HEIGHT, 20):
-        pygame.draw.rect(screen, WHITE, (WIDTH // 2 - 2, y, 4, 10))
-    
-    # Draw score
-    score_text1 = font.render(str(score_player1), True, WHITE)
-    score_text2 = font.render(str(score_player2), True, WHITE)
-    screen.blit(score_text1, (WIDTH // 4, 20))
-    screen.blit(score_text2, (3 * WIDTH // 4 - score_text2.get_width(), 20))
+        pygame.draw.rect(surface, WHITE, (WIDTH // 2 - 2, y, 4, 10))
     
     # Draw title
-    title_font = pygame.font.Font(None, 30)
-    title_text = title_font.render("PONG 2: ELECTRIC BOOGALOO", True, WHITE)
-    screen.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 10))
+    title_text = render_text(get_font(None, 30), "PONG 2: ELECTRIC BOOGALOO", WHITE)
+    surface.blit(title_text, (WIDTH // 2 - title_text.get_width() // 2, 10))
+
+# Last HUD key and items; the HUD only changes with the values in the key
+hud_cache = [None, None]
+
+def hud_items(sim):
+    """(text surface, rect) pairs for the scores, active powerups and ball count"""
+    key = (sim.score_player1, sim.score_player2, len(sim.balls), *sim.powerup_stacks.values())
+    if key == hud_cache[0]:
+        return hud_cache[1]
+    font = get_font(None, 36)
     
-    # Draw active powerups with stack counts
-    active_powerup_text = []
-    for powerup_name, stack_count in powerup_stacks.items():
-        if stack_count > 0:
-            active_powerup_text.append(f"{powerup_name} x{stack_count}")
+    # Score
+    score_text1 = render_text(font, str(sim.score_player1), WHITE)
+    score_text2 = render_text(font, str(sim.score_player2), WHITE)
+    items = [
+        (score_text1, score_text1.get_rect(topleft=(WIDTH // 4, 20))),
+        (score_text2, score_text2.get_rect(topright=(3 * WIDTH // 4, 20)))
+    ]
     
+    # Active powerups with stack counts
     y_offset = 50
-    for text in active_powerup_text:
-        powerup_display = font.render(text, True, WHITE)
-        screen.blit(powerup_display, (WIDTH // 2 - powerup_display.get_width() // 2, y_offset))
-        y_offset += 30
+    for powerup_name, stack_count in sim.powerup_stacks.items():
+        if stack_count > 0:
+            powerup_display = render_text(font, f"{powerup_name} x{stack_count}", WHITE)
+            items.append((powerup_display, powerup_display.get_rect(midtop=(WIDTH // 2, y_offset))))
+            y_offset += 30
+    
+    # Ball count
+    ball_count_text = render_text(font, f"Balls: {len(sim.balls)}", WHITE)
+    items.append((ball_count_text, ball_count_text.get_rect(midtop=(WIDTH // 2, HEIGHT - 30))))
+    hud_cache[0] = key
+    hud_cache[1] = items
+    return items
+
+def draw_game(surface, sim, alpha=1.0):
+    surface.fill(BLACK)
+    draw_objects(surface, sim, alpha)
+    draw_static(surface)
+    for text, rect in hud_items(sim):
+        surface.blit(text, rect)
+
+class DirtyRenderer:
+    """Redraws only the parts of the screen that changed since the last frame.
+    
+    The center line and title are baked once into a background surface.
+    Each frame restores the background under last frame's paddles, balls and
+    powerups and under HUD text that changed, draws the new frame on top and
+    pushes just those rectangles with pygame.display.update().
+    
+    draw_game() draws the center line and title over the objects, so they
+    are also kept on a transparent foreground that is blitted back over
+    every object.
+    """
+    MAX_DIRTY_RECTS = 200  # Past this many, one full-screen update is cheaper
+    
+    def __init__(self, surface):
+        self.surface = surface
+        self.background = pygame.Surface(surface.get_size()).convert()
+        self.background.fill(BLACK)
+        draw_static(self.background)
+        self.foreground = pygame.Surface(surface.get_size(), pygame.SRCALPHA)
+        draw_static(self.foreground)
+        self.object_rects = None  # None forces a full redraw
+        self.hud = []
+        self.overlay_rect = None
+    
+    def object_rects_for(self, sim, alpha=1.0):
+        rects = list(paddle_rects(sim, alpha))
+        rects.extend(sim.balls.rects(alpha))
+        rects.extend(powerup.rect.copy() for powerup in sim.powerups)
+        return rects
+    
+    def draw(self, sim, overlay=None, alpha=1.0, effects=None):
+        """Draw a frame; overlay(surface) may draw on top and return the rect it covered.
         
-    # Draw ball count
-    ball_count_text = font.render(f"Balls: {len(balls)}", True, WHITE)
-    screen.blit(ball_count_text, (WIDTH // 2 - ball_count_text.get_width() // 2, HEIGHT - 30))
+        effects(surface), e.g. ParticleSystem.draw, is drawn over the HUD
+        and returns rects covering what it drew, which are erased next frame.
+        """
+        surface = self.surface
+        background = self.background
+        object_rects = self.object_rects_for(sim, alpha)
+        hud = hud_items(sim)
+        
+        if self.object_rects is None or len(object_rects) + len(self.object_rects) > self.MAX_DIRTY_RECTS:
+            # Full redraw, e.g. on the first frame or with a screen full of balls
+            surface.blit(background, (0, 0))
+            draw_objects(surface, sim, alpha)
+            for rect in object_rects:
+                surface.blit(self.foreground, rect, rect)
+            for text, rect in hud:
+                surface.blit(text, rect)
+            if effects is not None:
+                object_rects.extend(effects(surface))
+            self.overlay_rect = overlay(surface) if overlay is not None else None
+            pygame.display.update()
+            self.object_rects = object_rects
+            self.hud = hud
+            return
+        
+        # HUD text that is new or touched by a moving object (or the
+        # overlay) gets redrawn. Its area is erased first, since blending
+        # anti-aliased text over itself would thicken it
+        moved = self.object_rects + object_rects
+        if self.overlay_rect is not None:
+            moved.append(self.overlay_rect)
+        redraw = [(text, rect) for text, rect in hud
+                  if (text, rect) not in self.hud or rect.collidelist(moved) != -1]
+        
+        # Erase last frame's objects and any HUD text that changed or went away
+        erased = self.object_rects + [rect for text, rect in self.hud if (text, rect) not in hud]
+        erased.extend(rect for text, rect in redraw)
+        if self.overlay_rect is not None:
+            erased.append(self.overlay_rect)
+        for rect in erased:
+            surface.blit(background, rect, rect)
+        
+        draw_objects(surface, sim, alpha)
+        for rect in object_rects:
+            surface.blit(self.foreground, rect, rect)
+        for text, rect in redraw:
+            surface.blit(text, rect)
+        if effects is not None:
+            object_rects.extend(effects(surface))
+        updated = erased + object_rects
+        self.overlay_rect = overlay(surface) if overlay is not None else None
+        if self.overlay_rect is not None:
+            updated.append(self.overlay_rect)
+        
+        pygame.display.update(updated)
+        self.object_rects = object_rects
+        self.hud = hud
+
+def run_replay_headless(sim, runs, ticks):
+    """Re-simulate a replay as fast as the CPU allows and return ticks per second"""
+    start = time.perf_counter()
+    for bits in iter_inputs(runs):
+        sim.step(*input_moves(bits))
+    elapsed = time.perf_counter() - start
+    return ticks / elapsed if elapsed > 0 else math.inf
+
+class PongScene(Scene):
+    """A match as a scene, for the launcher and for main().
+    
+    The match, sounds and particle sprites are made on the first enter()
+    and kept, so leaving the scene pauses the match. main() passes its
+    own simulation along with the AI players, replay inputs and recorder
+    its options asked for; without them both players use the keyboard.
+    """
+    title = 'PONG 2: ELECTRIC BOOGALOO'
+    size = (WIDTH, HEIGHT)
+    
+    def __init__(self, sim=None, ai1=None, ai2=None, replay_inputs=None, recorder=None,
+                 sound=True, particles=True):
+        self.sim = sim
+        self.ai1 = ai1
+        self.ai2 = ai2
+        self.replay_inputs = replay_inputs  # Ends the scene when exhausted
+        self.recorder = recorder
+        self.sound = sound
+        self.use_particles = particles and np is not None
+        self.sounds = None
+        self.particles = None
+        self.powerup_colors = None
+        self.phase = null_phase
+        self.accumulator = 0.0
+        self.alpha = 1.0  # How far the frame is between the last two physics steps
+    
+    def enter(self, screen):
+        if self.sim is None:
+            self.sim = PongSimulation()
+        if self.sound and self.sounds is None:
+            self.sounds = AUDIO.SoundBank(pan_width=WIDTH)
+        if self.use_particles and self.particles is None:
+            self.particles = ParticleSystem()
+            self.powerup_colors = {powerup_type["name"]: powerup_type["color"]
+                                   for powerup_type in self.sim.powerup_types}
+        self.accumulator = 0.0
+    
+    def update(self, dt):
+        # Physics advances in fixed steps of sim.dt, however long frames take:
+        # each frame banks its real duration and runs as many steps as fit,
+        # then draws the objects part way between the last two steps
+        sim = self.sim
+        phase = self.phase
+        sounds = self.sounds
+        particles = self.particles
+        frame_time = min(dt, MAX_FRAME_TIME)
+        self.accumulator += frame_time
+        with phase("input"):
+            keys = pygame.key.get_pressed()
+        
+        while self.accumulator >= sim.dt:
+            self.accumulator -= sim.dt
+            with phase("input"):
+                if self.replay_inputs is not None:
+                    bits = next(self.replay_inputs, None)
+                    if bits is None:
+                        self.finished = True  # End of the replay
+                        break
+                else:
+                    # Player 1 (left) controls - W and S, Player 2 (right) controls - Up and Down arrows
+                    p1_move = self.ai1.move() if self.ai1 is not None else keys[K_s] - keys[K_w]
+                    p2_move = self.ai2.move() if self.ai2 is not None else keys[K_DOWN] - keys[K_UP]
+                    bits = input_bits(p1_move, p2_move)
+                
+                if self.recorder is not None:
+                    self.recorder.record(bits)
+            sim.save_positions()
+            sim.step(*input_moves(bits))
+            if sounds is not None:
+                with phase("sound"):
+                    sounds.play_events(sim.events)
+            if particles is not None and sim.events:
+                particles.emit_events(sim.events, self.powerup_colors)
+        if particles is not None:
+            with phase("particles"):
+                particles.update(frame_time)
+        self.alpha = self.accumulator / sim.dt
+        return True
+    
+    def draw(self, surface):
+        draw_game(surface, self.sim, self.alpha)
+        if self.particles is not None:
+            self.particles.draw(surface)
+    
+    def exit(self):
+        if self.sounds is not None:
+            self.sounds.stop()
 
 # Main game loop
-def main():
-    global powerup_spawn_timer, next_powerup_time
-    global score_player1, score_player2
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='PONG 2: ELECTRIC BOOGALOO')
+    parser.add_argument('--numpy', action='store_true',
+                        help='use the NumPy struct-of-arrays ball store')
+    parser.add_argument('--stress', type=int, default=0, metavar='BALLS',
+                        help='stress mode: keep this many extra balls in play')
+    parser.add_argument('--ball-collisions', action='store_true',
+                        help='let balls bounce off each other')
+    parser.add_argument('--dirty', action='store_true',
+                        help='only redraw and present the parts of the screen that changed')
+    parser.add_argument('--seed', type=int, help='random seed for the match')
+    parser.add_argument('--record', metavar='FILE', help='record the match to a replay file')
+    parser.add_argument('--replay', metavar='FILE', help='play back a replay file')
+    parser.add_argument('--fast', action='store_true',
+                        help='with --replay: re-simulate without a display as fast as possible')
+    parser.add_argument('--ai', choices=['1', '2', 'both'],
+                        help='let the computer play player 1, player 2 or both')
+    parser.add_argument('--ai-delay', type=float, default=150, metavar='MS',
+                        help='computer reaction delay in milliseconds (default: 150)')
+    parser.add_argument('--ai-error', type=float, default=20, metavar='PIXELS',
+                        help='spread of the computer\'s aim in pixels (default: 20)')
+    parser.add_argument('--physics-hz', type=float, default=FPS, metavar='HZ',
+                        help=f'physics steps per second, independent of the frame rate (default: {FPS})')
+    parser.add_argument('--max-fps', type=float, default=240, metavar='FPS',
+                        help='frame rate cap on top of vsync, 0 for none (default: 240)')
+    parser.add_argument('--mute', action='store_true', help='play no sound effects')
+    parser.add_argument('--no-particles', action='store_true',
+                        help='turn off hit, goal and pickup particle effects')
+    parser.add_argument('--profile', action='store_true',
+                        help='start with the frame profiler overlay shown (toggle with F3)')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='write per-frame phase timings as a Chrome trace')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print how long each startup step took once the first frame is shown')
+    args = parser.parse_args(argv)
+    if args.numpy and np is None:
+        parser.error('--numpy needs NumPy installed')
+    if args.physics_hz <= 0:
+        parser.error('--physics-hz must be positive')
+    if args.seed is not None and not 0 <= args.seed <= MAX_SEED:
+        parser.error(f'--seed must be between 0 and {MAX_SEED}')
+    STARTUP.mark("imports")
+    
+    replay_inputs = None
+    if args.replay:
+        settings, runs, ticks, checksum = load_replay(args.replay)
+        sim = PongSimulation(**settings)
+        if args.fast:
+            rate = run_replay_headless(sim, runs, ticks)
+            matched = sim.state_checksum() == checksum
+            print(f"{ticks} ticks at {rate:.0f} ticks/s, final state "
+                  f"{'matches' if matched else 'DOES NOT match'} the recording")
+            sys.exit(0 if matched else 1)
+        replay_inputs = iter_inputs(runs)
+    else:
+        sim = PongSimulation(seed=args.seed, dt=1.0 / args.physics_hz, numpy_balls=args.numpy,
+                             stress_balls=args.stress, ball_collisions=args.ball_collisions)
+    recorder = ReplayRecorder(sim.settings) if args.record else None
+    ai1 = ai2 = None
+    if args.ai in ('1', 'both'):
+        ai1 = InterceptAI(sim, 1, args.ai_delay, args.ai_error)
+    if args.ai in ('2', 'both'):
+        ai2 = InterceptAI(sim, 2, args.ai_delay, args.ai_error)
+    scene = PongScene(sim, ai1, ai2, replay_inputs, recorder,
+                      sound=not args.mute, particles=not args.no_particles)
+    STARTUP.mark("simulation")
+    
+    # Initialize Pygame
+    AUDIO.pre_init()
+    pygame.init()
+    STARTUP.mark("pygame.init")
+    
+    # Create the screen, synced to the display's refresh where the driver can
+    try:
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), vsync=1)
+    except pygame.error:
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption('PONG 2: ELECTRIC BOOGALOO')
+    STARTUP.mark("display")
+    clock = pygame.time.Clock()
+    renderer = DirtyRenderer(screen) if args.dirty else None
+    profiler = FrameProfiler(args.trace, args.profile)
+    scene.phase = sim.phase = profiler.phase
+    phase = profiler.phase
+    scene.enter(screen)
+    STARTUP.mark("sounds")
+    effects = scene.particles.draw if scene.particles is not None else None
     
+    last_time = time.perf_counter()
     running = True
     while running:
-        # Handle events
-        for event in pygame.event.get():
-            if event.type == QUIT:
-                pygame.quit()
-                sys.exit()
-        
-        # Handle keyboard input
-        keys = pygame.key.get_pressed()
-        
-        # Player 1 (left) controls - W and S
-        if keys[K_w] and player1.top > 0:
-            player1.y -= paddle_speed
-        if keys[K_s] and player1.bottom < HEIGHT:
-            player1.y += paddle_speed
-        
-        # Player 2 (right) controls - Up and Down arrows
-        if keys[K_UP] and player2.top > 0:
-            player2.y -= paddle_speed
-        if keys[K_DOWN] and player2.bottom < HEIGHT:
-            player2.y += paddle_speed
-        
-        # Update all balls
-        for ball in balls[:]:  # Use a copy for safe iteration
-            result = ball.update()
-            
-            # Handle scoring
-            if result == "right_score":
-                score_player2 += 1
-                if ball is balls[0]:  # If it's the primary ball
-                    reset_primary_ball()
-                else:
-                    balls.remove(ball)  # Remove this extra ball
-            elif result == "left_score":
-                score_player1 += 1
-                if ball is balls[0]:  # If it's the primary ball
-                    reset_primary_ball()
+        profiler.begin_frame()
+        now = time.perf_counter()
+        frame_time = now - last_time
+        last_time = now
+        with phase("input"):
+            # Handle events
+            for event in pygame.event.get():
+                if event.type == QUIT:
+                    running = False
                 else:
-                    balls.remove(ball)  # Remove this extra ball
-            
-            # Check paddle collisions
-            ball.check_paddle_collision(player1, player2)
-        
-        # Make sure we always have at least one ball
-        if not balls:
-            balls.append(Ball())
-        
-        # Powerup handling
-        current_time = pygame.time.get_ticks()
-        powerup_spawn_timer = current_time
-        
-        # Spawn new powerups more frequently
-        if powerup_spawn_timer >= next_powerup_time:
-            spawn_powerup()
-            # More frequent as game progresses
-            next_powerup_time = current_time + random.randint(2000, 5000)
-        
-        # Check for powerup collisions with any ball
-        for powerup in powerups[:]:
-            is_collected = False
-            for ball in balls:
-                if powerup["rect"].colliderect(ball.rect) and not powerup["collected"]:
-                    is_collected = True
-                    break
-                    
-            if is_collected:
-                powerup["collected"] = True
-                apply_powerup(powerup["type"])
-                powerups.remove(powerup)
+                    profiler.handle_event(event)
         
-        # Update active powerups
-        update_powerups()
+        scene.update(frame_time)
+        if scene.finished:
+            running = False  # End of the replay
         
         # Draw everything
-        draw_game()
-        
-        pygame.display.flip()
-        clock.tick(FPS)
+        if renderer is not None:
+            with phase("draw_game"):
+                renderer.draw(sim, profiler.draw, scene.alpha, effects)
+        else:
+            with phase("draw_game"):
+                scene.draw(screen)
+                profiler.draw(screen)
+            with phase("display.flip"):
+                pygame.display.flip()
+        if args.startup_report:
+            STARTUP.mark("first frame")
+            STARTUP.report()
+            args.startup_report = False
+        with phase("clock.tick"):
+            clock.tick(args.max_fps)
+        profiler.end_frame()
+    
+    scene.exit()
+    if recorder is not None:
+        recorder.save(args.record, sim.state_checksum())
+    profiler.close()
+    clear_cache()
+    hud_cache[0] = hud_cache[1] = None
+    pygame.quit()
+    sys.exit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,180 @@
+import json
+import time
+from collections import deque
+import pygame
+from TEXTCACHE import get_font
+
+# Frame profiler shared by PONG2, GRID and GRIDtest. Game loops wrap each
+# part of a frame in `with profiler.phase("name"):` between begin_frame()
+# and end_frame(). F3 toggles an overlay with rolling per-phase timings and
+# a frame time histogram, and a trace path writes every phase of every
+# frame as Chrome trace events (open in chrome://tracing or Perfetto).
+#
+# While neither is on, phase() hands back one shared do-nothing context
+# manager, so instrumented code costs a method call per phase.
+
+TOGGLE_KEY = pygame.K_F3
+HISTORY_FRAMES = 120  # Frames the overlay averages over
+OVERLAY_REFRESH_FRAMES = 15  # Re-render the overlay text this often
+HISTOGRAM_BUCKETS = (4, 8, 12, 17, 25, 33, 50, 100)  # Frame time bucket upper bounds in ms
+OVERLAY_COLOR = (255, 255, 255)
+OVERLAY_BACKGROUND = (0, 0, 0, 190)
+BAR_COLOR = (0, 200, 255)
+
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_SPAN = NullSpan()
+
+def null_phase(name):
+    """Stand-in for FrameProfiler.phase where no profiler is attached"""
+    return NULL_SPAN
+
+class Span:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.name, self.start, time.perf_counter_ns())
+        return False
+
+class FrameProfiler:
+    """Per-phase frame timings for an overlay and an optional Chrome trace file"""
+    def __init__(self, trace_path=None, overlay=False):
+        self.overlay = overlay
+        self.trace = None
+        if trace_path:
+            self.trace = open(trace_path, "w")
+            self.trace.write("[\n")
+        self.active = overlay or self.trace is not None
+        self.spans = {}  # Phase name -> reusable Span
+        self.phases = {}  # Phase name -> nanoseconds spent in it this frame
+        self.events = []  # (name, start, end) of this frame, for the trace
+        self.history = deque(maxlen=HISTORY_FRAMES)  # (frame ns, phases) per frame
+        self.frame_start = 0
+        self.frames = 0
+        self.first_event = True
+        self.origin = time.perf_counter_ns()
+        self.panel = None
+
+    def phase(self, name):
+        if not self.active:
+            return NULL_SPAN
+        span = self.spans.get(name)
+        if span is None:
+            span = self.spans[name] = Span(self, name)
+        return span
+
+    def add(self, name, start, end):
+        self.phases[name] = self.phases.get(name, 0) + end - start
+        if self.trace is not None:
+            self.events.append((name, start, end))
+
+    def begin_frame(self):
+        if self.active:
+            self.frame_start = time.perf_counter_ns()
+
+    def end_frame(self):
+        if not self.active:
+            return
+        end = time.perf_counter_ns()
+        if self.frame_start:
+            self.history.append((end - self.frame_start, self.phases))
+            if self.trace is not None:
+                self.events.append(("frame", self.frame_start, end))
+                self.write_events()
+        self.phases = {}
+        self.events.clear()
+        self.frames += 1
+
+    def write_events(self):
+        lines = []
+        for name, start, end in self.events:
+            lines.append(json.dumps({
+                "name": name, "ph": "X", "pid": 1, "tid": 1,
+                "ts": (start - self.origin) / 1000, "dur": (end - start) / 1000,
+                "args": {"frame": self.frames}
+            }))
+        if lines:
+            self.trace.write(("" if self.first_event else ",\n") + ",\n".join(lines))
+            self.first_event = False
+
+    def handle_event(self, event):
+        """Toggle the overlay on F3; returns True if the event was used"""
+        if event.type == pygame.KEYDOWN and event.key == TOGGLE_KEY:
+            was_active = self.active
+            self.overlay = not self.overlay
+            self.active = self.overlay or self.trace is not None
+            if not was_active:
+                self.frame_start = 0  # The frame in progress was not timed
+            self.panel = None
+            return True
+        return False
+
+    def render_panel(self):
+        font = get_font(None, 20)
+        frames = len(self.history)
+        totals = {}
+        peaks = {}
+        for frame_time, phases in self.history:
+            for name, elapsed in phases.items():
+                totals[name] = totals.get(name, 0) + elapsed
+                peaks[name] = max(peaks.get(name, 0), elapsed)
+        frame_times = [frame_time / 1e6 for frame_time, phases in self.history]
+        average = sum(frame_times) / frames
+        lines = [f"frame  {average:6.2f} avg {max(frame_times):6.2f} max ms  ({1000 / average:.0f} fps)"]
+        for name, total in totals.items():
+            lines.append(f"{name:<16}{total / frames / 1e6:6.2f} avg {peaks[name] / 1e6:6.2f} max")
+
+        # Frame time histogram, one bar per bucket
+        counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        for frame_time in frame_times:
+            bucket = 0
+            while bucket < len(HISTOGRAM_BUCKETS) and frame_time >= HISTOGRAM_BUCKETS[bucket]:
+                bucket += 1
+            counts[bucket] += 1
+        labels = [f"<{bound}" for bound in HISTOGRAM_BUCKETS] + [f">{HISTOGRAM_BUCKETS[-1]}"]
+
+        line_height = font.get_linesize()
+        texts = [font.render(line, True, OVERLAY_COLOR) for line in lines]
+        width = max(max(text.get_width() for text in texts), 260) + 16
+        height = (len(texts) + len(counts)) * line_height + 20
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill(OVERLAY_BACKGROUND)
+        y = 8
+        for text in texts:
+            panel.blit(text, (8, y))
+            y += line_height
+        y += 4
+        for label, count in zip(labels, counts):
+            panel.blit(font.render(f"{label:>4} ms", True, OVERLAY_COLOR), (8, y))
+            bar_width = (width - 80) * count // max(counts)
+            pygame.draw.rect(panel, BAR_COLOR, (72, y + 2, bar_width, line_height - 4))
+            y += line_height
+        return panel
+
+    def draw(self, surface, position=(10, 10)):
+        """Blit the overlay if it is on; returns the rect it covers, or None"""
+        if not self.overlay or not self.history:
+            return None
+        if self.panel is None or self.frames % OVERLAY_REFRESH_FRAMES == 0:
+            self.panel = self.render_panel()
+        return surface.blit(self.panel, position)
+
+    def close(self):
+        if self.trace is not None:
+            self.trace.write("\n]\n")
+            self.trace.close()
+            self.trace = None
@@ -0,0 +1,111 @@
+import struct
+
+# Compact PONG2 replay files. A replay is the simulation settings and seed,
+# the per-tick input bitmasks as run-length encoded (bits, run length) pairs
+# and a checksum of the final game state, so playback can prove it
+# re-simulated the match bit for bit.
+#
+# Layout (little endian):
+#   header   magic, version, seed, dt, ball speed, paddle speed, stress balls, flags
+#   runs     one byte of input bits followed by the run length as a varint, repeated
+#   trailer  tick count, final state checksum (both uint32)
+
+MAGIC = b"PNG2"
+VERSION = 2  # Bumped whenever simulation changes make older recordings diverge
+HEADER = struct.Struct("<4sBQdddIB")
+TRAILER = struct.Struct("<II")
+MAX_SEED = 2 ** 64 - 1  # The header stores the seed unsigned
+
+# Header flags
+FLAG_NUMPY_BALLS = 1
+FLAG_BALL_COLLISIONS = 2
+
+class ReplayError(Exception):
+    pass
+
+class ReplayRecorder:
+    """Collects one input bitmask per tick, run-length encoding as it goes"""
+    def __init__(self, settings):
+        # Checked up front, so a match is not played only to fail when saved
+        if not 0 <= settings["seed"] <= MAX_SEED:
+            raise ReplayError(f"seed {settings['seed']} can't be recorded; it must be 0 to {MAX_SEED}")
+        self.settings = settings  # PongSimulation keyword arguments, including the seed
+        self.runs = bytearray()
+        self.bits = None
+        self.run = 0
+        self.ticks = 0
+
+    def record(self, bits):
+        if bits == self.bits:
+            self.run += 1
+        else:
+            self.flush_run()
+            self.bits = bits
+            self.run = 1
+        self.ticks += 1
+
+    def flush_run(self):
+        if self.run:
+            self.runs.append(self.bits)
+            write_varint(self.runs, self.run)
+            self.run = 0
+
+    def save(self, path, checksum):
+        self.flush_run()
+        settings = self.settings
+        flags = 0
+        if settings.get("numpy_balls"):
+            flags |= FLAG_NUMPY_BALLS
+        if settings.get("ball_collisions"):
+            flags |= FLAG_BALL_COLLISIONS
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, settings["seed"], settings["dt"],
+                                settings["ball_speed"], settings["paddle_speed"],
+                                settings.get("stress_balls", 0), flags))
+            f.write(self.runs)
+            f.write(TRAILER.pack(self.ticks, checksum))
+
+def write_varint(buffer, value):
+    # 7 bits per byte, high bit set on every byte but the last
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def load_replay(path):
+    """Read a replay file into (settings, runs, tick count, final state checksum)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size + TRAILER.size:
+        raise ReplayError(f"{path} is too short to be a replay")
+    magic, version, seed, dt, ball_speed, paddle_speed, stress_balls, flags = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ReplayError(f"{path} is not a version {VERSION} PONG2 replay")
+    ticks, checksum = TRAILER.unpack_from(data, len(data) - TRAILER.size)
+    settings = {
+        "seed": seed,
+        "dt": dt,
+        "ball_speed": ball_speed,
+        "paddle_speed": paddle_speed,
+        "stress_balls": stress_balls,
+        "numpy_balls": bool(flags & FLAG_NUMPY_BALLS),
+        "ball_collisions": bool(flags & FLAG_BALL_COLLISIONS)
+    }
+    return settings, data[HEADER.size:len(data) - TRAILER.size], ticks, checksum
+
+def iter_inputs(runs):
+    """Yield the input bitmask of every tick stored in runs"""
+    i = 0
+    while i < len(runs):
+        bits = runs[i]
+        i += 1
+        run = shift = 0
+        while True:
+            byte = runs[i]
+            i += 1
+            run |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                break
+        for _ in range(run):
+            yield bits
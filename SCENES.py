@@ -0,0 +1,117 @@
+import time
+import pygame
+from IDLE import block_high_rate_events, wait_events, REDRAW_EVENTS
+
+# Scenes let the launcher run every game in one window and one process.
+# A scene is entered with the shared display surface, gets each event
+# through handle_event() and the frame time through update(), draws
+# itself in draw() and is told in exit() when another scene takes over.
+# Scene objects outlive their visits: a game left for the menu resumes
+# where it was, and what a scene loaded on its first enter() stays loaded.
+#
+# Idle scenes (the code locks) sleep between inputs and only redraw when
+# an event or update() asked for it, like their standalone loops; the
+# others (PONG2) run every frame.
+
+MAX_FPS = 240  # Frame cap for scenes that aren't idle
+
+class Scene:
+    """Base scene; every hook does nothing by default"""
+    title = "OBELISKS"
+    size = (600, 700)
+    idle = False  # Sleep between inputs and redraw only on change
+    hover = False  # For idle scenes: let MOUSEMOTION through for hover effects
+    finished = False  # Set to leave the scene for next_scene
+    next_scene = None  # Name of the scene to go to when finished, None for the home scene
+
+    def enter(self, screen):
+        pass
+
+    def handle_event(self, event):
+        """React to an event; returns True when the scene has to be redrawn"""
+        return False
+
+    def update(self, dt):
+        """Advance by dt seconds; returns True when the scene has to be redrawn"""
+        return not self.idle
+
+    def draw(self, surface):
+        pass
+
+    def exit(self):
+        pass
+
+class SceneManager:
+    """Runs one scene at a time in a single window; Escape goes back to the home scene"""
+    def __init__(self, scenes, home):
+        self.scenes = scenes  # Name -> Scene
+        self.home = home
+        self.screen = None
+        self.scene = None
+        self.next_name = home
+        self.clock = pygame.time.Clock()
+
+    def switch(self, name):
+        """Leave the current scene for the one called name before the next frame"""
+        self.next_name = name
+
+    def enter_next(self):
+        if self.scene is not None:
+            self.scene.exit()
+        scene = self.scene = self.scenes[self.next_name]
+        self.next_name = None
+        scene.finished = False
+        # set_mode() on an open window resizes it and keeps the same surface
+        if self.screen is None or self.screen.get_size() != scene.size:
+            self.screen = pygame.display.set_mode(scene.size)
+        pygame.display.set_caption(scene.title)
+        scene.enter(self.screen)
+        if not scene.idle:
+            pygame.event.set_allowed(None)  # Undo an idle scene's blocking
+
+    def run(self, first_frame=None):
+        """Run scenes until the window is closed; first_frame() is called once the first frame is shown"""
+        redraw = True
+        last_time = time.perf_counter()
+        while True:
+            if self.next_name is not None:
+                self.enter_next()
+                redraw = True
+                last_time = time.perf_counter()
+            scene = self.scene
+            if scene.idle:
+                block_high_rate_events(hover=scene.hover)
+                events = wait_events()
+            else:
+                events = pygame.event.get()
+
+            for event in events:
+                if event.type == pygame.QUIT:
+                    scene.exit()
+                    return
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    if scene is self.scenes[self.home]:
+                        scene.exit()
+                        return
+                    self.switch(self.home)
+                elif event.type in REDRAW_EVENTS:
+                    redraw = True
+                elif scene.handle_event(event):
+                    redraw = True
+
+            now = time.perf_counter()
+            if scene.update(now - last_time):
+                redraw = True
+            last_time = now
+            if redraw:
+                scene.draw(self.screen)
+                pygame.display.flip()
+                redraw = False
+                if first_frame is not None:
+                    first_frame()
+                    first_frame = None
+
+            if scene.finished:
+                self.switch(scene.next_scene or self.home)
+            if not scene.idle:
+                self.clock.tick(MAX_FPS)
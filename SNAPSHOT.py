@@ -0,0 +1,267 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import sys
+import time
+import fnmatch
+import json
+import argparse
+import random
+import pygame
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Golden-image checks for GRID, GRIDtest, PONG2 and launcher menu rendering, run without a
+# real display. Every snapshot set draws a series of fixed, seeded states
+# and each frame is compared to a stored golden PNG with NumPy. A frame
+# fails when more than --max-fraction of its pixels differ by more than
+# --tolerance in any channel. The frame and a diff image (differing pixels
+# in red over a dimmed golden) are then written to the failure directory.
+# A missing golden is a failure too; only --update records goldens.
+#
+#   python SNAPSHOT.py                 # check every set
+#   python SNAPSHOT.py 'pong2/*'       # check matching snapshots only
+#   python SNAPSHOT.py --update        # re-record every golden
+#
+# The goldens in snapshots/ are committed. Text rendering depends on the
+# pygame, SDL and FreeType versions and on the fonts found, so --update
+# also writes that environment to snapshots/ENVIRONMENT.json. A run in a
+# different environment still checks, but it prints what differs first,
+# since text in every frame may then fail. PONG2's dirty renderer is
+# checked against the goldens of the full redraw, which must match it
+# pixel for pixel.
+
+GOLDEN_DIR = "snapshots"
+ENVIRONMENT_FILE = "ENVIRONMENT.json"  # In the golden directory
+# (name, bold) of every system font the snapshots draw text with
+SYSTEM_FONTS = [("Arial", False), ("Arial", True), ("Courier New", False), ("Courier New", True)]
+FAILURE_DIR = "snapshots/failures"
+SEED = 1234
+
+snapshot_sets = []
+
+def snapshot_set(name):
+    """Register a generator of (snapshot name, surface, golden name or None)"""
+    def register(generate):
+        snapshot_sets.append((name, generate))
+        return generate
+    return register
+
+@snapshot_set("grid")
+def grid_snapshots():
+    import GRID
+    GRID.init()
+    from MINEFIELD import random_board_symbols
+    rng = random.Random(SEED)
+    for size in (3, 9, 40):
+        for state in range(8):
+            code_lock = GRID.MinesweeperCodeLock(size, code=0)
+            code_lock.grid_symbols = random_board_symbols(size, seed=SEED + state)
+            code_lock.grid = rng.getrandbits(code_lock.cell_count) if state else 0
+            code_lock.status = (None, True, False)[state % 3]
+            code_lock.attempts = state
+            code_lock.draw(GRID.window)
+            yield f"grid/{size}x{size}_{state}", GRID.window, None
+
+@snapshot_set("gridtest")
+def gridtest_snapshots():
+    import GRIDtest
+    GRIDtest.init()
+    GRIDtest.correct_code[:] = [4, 0, 7]
+    GRIDtest.code_symbols = GRIDtest.get_code_symbols()
+    # The start button's hover color follows the real mouse
+    pygame.mouse.set_pos(0, 0)
+    states = [
+        ("start", {}),
+        ("revealed", {"show_code": True, "message": "Access code revealed"}),
+        ("entering_0", {"input_active": True, "show_button": False}),
+        ("entering_2", {"input_active": True, "show_button": False, "current_code": [4, 0]}),
+        ("entering_revealed", {"input_active": True, "show_button": False, "show_code": True,
+                               "current_code": [3]}),
+        ("success", {"show_button": False, "current_code": [4, 0, 7], "code_status": "success",
+                     "message": "Code Correct! Access Granted"}),
+        ("fail", {"show_button": False, "current_code": [1, 2, 3], "code_status": "fail",
+                  "message": "Incorrect Code. Press R to try again."})
+    ]
+    for name, values in states:
+        GRIDtest.reset_code()
+        for key, value in values.items():
+            setattr(GRIDtest, key, value)
+        GRIDtest.draw_screen()
+        yield f"gridtest/{name}", GRIDtest.screen, None
+    GRIDtest.reset_code()
+
+def pong_snapshots(numpy_balls, stress_balls, ticks, every):
+    import PONG2
+    screen = pygame.display.set_mode((PONG2.WIDTH, PONG2.HEIGHT))
+    frame = pygame.Surface((PONG2.WIDTH, PONG2.HEIGHT))
+    sim = PONG2.PongSimulation(seed=SEED, numpy_balls=numpy_balls, stress_balls=stress_balls)
+    ai1 = PONG2.InterceptAI(sim, 1, 150, 20)
+    ai2 = PONG2.InterceptAI(sim, 2, 150, 20)
+    renderer = PONG2.DirtyRenderer(screen)
+    store = "numpy" if numpy_balls else "list"
+    prefix = f"pong2/{store}_{stress_balls}"
+    for tick in range(1, ticks + 1):
+        sim.save_positions()
+        sim.step(ai1.move(), ai2.move())
+        # The dirty renderer has to see every frame to know what to erase
+        renderer.draw(sim, None, 0.5)
+        if tick % every:
+            continue
+        golden = f"{prefix}/t{tick:05d}_half"
+        PONG2.draw_game(frame, sim, 0.5)
+        yield golden, frame, None
+        yield f"{prefix}/t{tick:05d}_half_dirty", screen, golden
+        PONG2.draw_game(frame, sim)
+        yield f"{prefix}/t{tick:05d}", frame, None
+
+@snapshot_set("pong2")
+def pong2_snapshots():
+    yield from pong_snapshots(False, 0, 1800, 150)
+    yield from pong_snapshots(True, 0, 1800, 150)
+    yield from pong_snapshots(True, 200, 480, 120)
+
+@snapshot_set("launcher")
+def launcher_snapshots():
+    import LAUNCHER
+    screen = pygame.display.set_mode(LAUNCHER.MenuScene.size)
+    menu = LAUNCHER.MenuScene()
+    for name, hovered in [("menu", -1), ("menu_hover", len(menu.rows) - 1)]:
+        menu.hovered = hovered
+        menu.draw(screen)
+        yield f"launcher/{name}", screen, None
+
+def environment():
+    """Everything besides the code that changes how the snapshots render"""
+    from TEXTCACHE import find_sysfont
+    fonts = {}
+    for name, bold in SYSTEM_FONTS:
+        path, fake_bold = find_sysfont(name, bold)
+        fonts[f"{name}{' bold' if bold else ''}"] = [path or pygame.font.get_default_font(), fake_bold]
+    return {
+        "pygame": pygame.version.ver,
+        "sdl": ".".join(map(str, pygame.get_sdl_version())),
+        "sdl_ttf": ".".join(map(str, pygame.font.get_sdl_ttf_version())),
+        "fonts": fonts
+    }
+
+def check_environment(args):
+    """Record the environment with --update, otherwise warn about what differs from it"""
+    path = os.path.join(args.golden_dir, ENVIRONMENT_FILE)
+    current = environment()
+    if args.update:
+        os.makedirs(args.golden_dir, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+        return
+    try:
+        with open(path) as f:
+            recorded = json.load(f)
+    except (OSError, ValueError):
+        print(f"warning: no {path}, so the goldens' environment is unknown")
+        return
+    for key, value in current.items():
+        if recorded.get(key) != value:
+            print(f"warning: {key} is {value}, the goldens were recorded with {recorded.get(key)}")
+
+def diff_image(golden, actual, mask):
+    # Dimmed golden with every differing pixel in red
+    image = golden // 3
+    image[mask] = (255, 0, 0)
+    return pygame.surfarray.make_surface(image)
+
+def save(surface, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pygame.image.save(surface, path)
+
+def check(name, surface, golden_name, args):
+    """Compare surface to its golden; returns "ok", "new", "updated" or a failure message"""
+    path = os.path.join(args.golden_dir, (golden_name or name) + ".png")
+    if golden_name is None and args.update:
+        existed = os.path.exists(path)
+        save(surface, path)
+        return "updated" if existed else "new"
+    if not os.path.exists(path):
+        return f"no golden {path} (record it with --update)"
+
+    golden_surface = pygame.image.load(path)
+    # Most frames match exactly, which comparing mapped pixels in the
+    # frame's own format settles quickly; anything else gets the RGB diff
+    if surface.get_size() == golden_surface.get_size() and np.array_equal(
+            pygame.surfarray.pixels2d(surface), pygame.surfarray.pixels2d(golden_surface.convert(surface))):
+        return "ok"
+    actual = pygame.surfarray.array3d(surface)
+    golden = pygame.surfarray.array3d(golden_surface)
+    if actual.shape != golden.shape:
+        message = f"size {actual.shape[:2]} differs from golden {golden.shape[:2]}"
+        mask = None
+    else:
+        difference = np.abs(actual.astype(np.int16) - golden).max(axis=2)
+        mask = difference > args.tolerance
+        changed = np.count_nonzero(mask)
+        if changed <= args.max_fraction * mask.size:
+            return "ok"
+        message = f"{changed} pixels differ (max {difference.max()})"
+    failure = os.path.join(args.failure_dir, name)
+    save(surface, failure + ".actual.png")
+    if mask is not None:
+        save(diff_image(golden, actual, mask), failure + ".diff.png")
+    return message
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check GRID, GRIDtest, PONG2 and launcher rendering against golden images.")
+    parser.add_argument("patterns", nargs="*", help="only check snapshots matching these globs")
+    parser.add_argument("--update", action="store_true", help="re-record the goldens instead of checking")
+    parser.add_argument("--tolerance", type=int, default=0,
+                        help="per-channel difference a pixel may have (default: 0)")
+    parser.add_argument("--max-fraction", type=float, default=0.0,
+                        help="share of pixels that may differ beyond the tolerance (default: 0)")
+    parser.add_argument("--golden-dir", default=GOLDEN_DIR)
+    parser.add_argument("--failure-dir", default=FAILURE_DIR,
+                        help="where failing frames and diff images are written")
+    parser.add_argument("--list", action="store_true", help="list the snapshot sets and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, generate in snapshot_sets:
+            print(name)
+        return 0
+    if np is None:
+        parser.error("golden-image checks need NumPy installed")
+
+    # The games load their images relative to the working directory
+    args.golden_dir = os.path.abspath(args.golden_dir)
+    args.failure_dir = os.path.abspath(args.failure_dir)
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    pygame.init()
+    check_environment(args)
+
+    start = time.perf_counter()
+    counts = {"ok": 0, "new": 0, "updated": 0}
+    failures = []
+    for set_name, generate in snapshot_sets:
+        for name, surface, golden_name in generate():
+            if args.patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in args.patterns):
+                continue
+            result = check(name, surface, golden_name, args)
+            if result in counts:
+                counts[result] += 1
+            else:
+                failures.append(name)
+                print(f"FAIL {name}: {result}")
+    elapsed = time.perf_counter() - start
+    print(f"{counts['ok']} matched, {counts['new']} new, {counts['updated']} updated, "
+          f"{len(failures)} failed in {elapsed:.1f}s")
+    if failures:
+        print(f"Failing frames and diffs are in {args.failure_dir}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
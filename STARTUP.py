@@ -0,0 +1,27 @@
+import sys
+import time
+
+# Startup timing for --startup-report. The scripts import this module
+# before anything else, so its clock starts ahead of the pygame, NumPy and
+# PIL imports, then mark() each startup step as it finishes. report()
+# prints how long every step took, usually right after the first frame
+# is on screen.
+
+START = time.perf_counter()
+
+steps = []  # (step name, seconds) in the order they finished
+last_mark = START
+
+def mark(name):
+    """Record that the step called name just finished"""
+    global last_mark
+    now = time.perf_counter()
+    steps.append((name, now - last_mark))
+    last_mark = now
+
+def report(file=None):
+    file = file or sys.stdout
+    print("startup:", file=file)
+    for name, seconds in steps:
+        print(f"  {name:<20}{seconds * 1000:8.1f} ms", file=file)
+    print(f"  {'total':<20}{(last_mark - START) * 1000:8.1f} ms", file=file)
@@ -0,0 +1,88 @@
+import os
+import json
+import pygame
+from collections import OrderedDict
+
+# Shared font and text surface cache for GRID, GRIDtest and PONG2.
+# Fonts are created once per process and rendered text is reused until it
+# falls out of a bounded LRU, so static labels render once and dynamic ones
+# (scores, counters) only re-render when their value changes.
+#
+# Finding a system font makes pygame scan every installed font, which is
+# slow on a cold start. The file each system font resolved to is kept in
+# FONT_PATH_CACHE across runs, so later launches open it directly. Delete
+# the file after installing fonts, since fonts that were missing stay
+# cached as pygame's default font.
+
+MAX_TEXT_SURFACES = 256
+FONT_PATH_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+                               "obelisks", "font-paths.json")
+
+fonts = {}
+text_surfaces = OrderedDict()
+font_paths = None  # "name:bold" -> [font file or None for the default font, fake bold]
+
+def load_font_paths():
+    global font_paths
+    try:
+        with open(FONT_PATH_CACHE) as f:
+            font_paths = json.load(f)
+    except (OSError, ValueError):
+        font_paths = {}
+
+def save_font_paths():
+    try:
+        os.makedirs(os.path.dirname(FONT_PATH_CACHE), exist_ok=True)
+        with open(FONT_PATH_CACHE, "w") as f:
+            json.dump(font_paths, f, indent=1)
+    except OSError:
+        pass  # A read-only home only costs the scan on the next launch
+
+def find_sysfont(name, bold=False):
+    """(font file or None, fake bold) that pygame.font.SysFont would use"""
+    if font_paths is None:
+        load_font_paths()
+    key = f"{name}:{int(bold)}"
+    entry = font_paths.get(key)
+    if entry is not None and (entry[0] is None or os.path.exists(entry[0])):
+        return entry
+    # Let SysFont do the lookup, but keep what it found instead of a Font
+    found = []
+    pygame.font.SysFont(name, 1, bold=bold,
+                        constructor=lambda path, size, fake_bold, fake_italic: found.append([path, fake_bold]))
+    font_paths[key] = entry = found[0]
+    save_font_paths()
+    return entry
+
+def get_font(name, size, bold=False, sysfont=False):
+    """Return a shared Font (or SysFont when sysfont is set), creating it once"""
+    key = (name, size, bold, sysfont)
+    font = fonts.get(key)
+    if font is None:
+        if sysfont:
+            path, fake_bold = find_sysfont(name, bold)
+            font = pygame.font.Font(path, size)
+            if fake_bold:
+                font.set_bold(True)
+        else:
+            font = pygame.font.Font(name, size)
+        fonts[key] = font
+    return font
+
+def render_text(font, text, color, antialias=True):
+    """Cached font.render(); callers must not draw onto the returned surface"""
+    key = (font, text, color, antialias)
+    surface = text_surfaces.get(key)
+    if surface is None:
+        surface = font.render(text, antialias, color)
+        text_surfaces[key] = surface
+        if len(text_surfaces) > MAX_TEXT_SURFACES:
+            text_surfaces.popitem(last=False)  # Evict the least recently used
+    else:
+        text_surfaces.move_to_end(key)
+    return surface
+
+def clear_cache():
+    # Needed after pygame.quit(), which invalidates every font
+    fonts.clear()
+    text_surfaces.clear()
@@ -0,0 +1,248 @@
+import os
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import sys
+import json
+import math
+import time
+import argparse
+import itertools
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import PONG2
+
+# AI-vs-AI balance runner for PONG2. Every combination of the swept settings
+# is played --matches times by two bots in headless PongSimulations spread
+# over a process pool, by default PONG2.InterceptAI paddles. Match results are streamed to a JSON lines file as
+# they finish and folded into per-config aggregates (win rates, score and
+# rally length distributions, how each powerup changes the game) that are
+# printed and written as a JSON report at the end.
+#
+#   python TOURNAMENT.py --ball-speed 6 7 9 --duration 4000 7000 --matches 50
+
+DEAD_ZONE = 10  # Pixels the ball may be off the paddle center before a chase bot moves
+
+class ChaseBot:
+    """Baseline bot that follows the primary ball vertically"""
+    def __init__(self, sim, player):
+        self.sim = sim
+        self.paddle = sim.player1 if player == 1 else sim.player2
+
+    def move(self):
+        ball_y = self.sim.balls.center(0)[1]
+        if ball_y < self.paddle.centery - DEAD_ZONE:
+            return -1
+        if ball_y > self.paddle.centery + DEAD_ZONE:
+            return 1
+        return 0
+
+def make_bot(sim, player, config):
+    if config["bot"] == "chase":
+        return ChaseBot(sim, player)
+    return PONG2.InterceptAI(sim, player, config["reaction_delay"], config["ai_error"])
+
+def make_powerup_types(duration, stack_limit):
+    # PONG2.powerup_types with the swept duration and stack limit
+    types = []
+    for powerup_type in PONG2.powerup_types:
+        powerup_type = dict(powerup_type)
+        if duration is not None:
+            powerup_type["duration"] = duration
+        if stack_limit is not None:
+            powerup_type["stack_limit"] = stack_limit
+        types.append(powerup_type)
+    return types
+
+def play_match(config, seed, target_score, max_ticks):
+    """Play one bot match and return its result as a JSON-ready dict"""
+    sim = PONG2.PongSimulation(seed=seed, ball_speed=config["ball_speed"],
+                               paddle_speed=config["paddle_speed"],
+                               powerup_types=make_powerup_types(config["duration"], config["stack_limit"]))
+    bot1 = make_bot(sim, 1, config)
+    bot2 = make_bot(sim, 2, config)
+    names = [powerup_type["name"] for powerup_type in sim.powerup_types]
+    rallies = []
+    rally = 0
+    pickups = Counter()
+    active_ticks = Counter()
+    active_goals = Counter()
+    active_hits = Counter()
+
+    while sim.ticks < max_ticks and max(sim.score_player1, sim.score_player2) < target_score:
+        sim.step(bot1.move(), bot2.move())
+        active = [name for name in names if sim.active_powerups[name]]
+        for name in active:
+            active_ticks[name] += 1
+        for event in sim.events:
+            kind = event[0]
+            if kind == "hit":
+                rally += 1
+                for name in active:
+                    active_hits[name] += 1
+            elif kind == "goal":
+                rallies.append(rally)
+                rally = 0
+                for name in active:
+                    active_goals[name] += 1
+            elif kind == "pickup":
+                pickups[event[1]] += 1
+
+    if sim.score_player1 > sim.score_player2:
+        winner = 1
+    elif sim.score_player2 > sim.score_player1:
+        winner = 2
+    else:
+        winner = 0
+    return {
+        "config": config,
+        "seed": seed,
+        "score": [sim.score_player1, sim.score_player2],
+        "winner": winner,
+        "ticks": sim.ticks,
+        "rallies": rallies,
+        "powerups": {name: {"pickups": pickups[name], "active_ticks": active_ticks[name],
+                            "goals": active_goals[name], "hits": active_hits[name]}
+                     for name in names}
+    }
+
+def config_key(config):
+    return ", ".join(f"{name}={value}" for name, value in config.items())
+
+class ConfigStats:
+    """Running aggregates over every finished match of one config"""
+    def __init__(self, config):
+        self.config = config
+        self.matches = 0
+        self.wins = Counter()
+        self.scores = Counter()  # "p1-p2" final score -> matches
+        self.rally_lengths = Counter()  # Paddle hits before a goal -> goals
+        self.ticks = 0
+        self.powerups = {}
+
+    def add(self, result):
+        self.matches += 1
+        self.wins[result["winner"]] += 1
+        self.scores["%d-%d" % tuple(result["score"])] += 1
+        self.rally_lengths.update(result["rallies"])
+        self.ticks += result["ticks"]
+        for name, stats in result["powerups"].items():
+            totals = self.powerups.setdefault(name, Counter())
+            totals.update(stats)
+
+    def report(self):
+        goals = sum(self.rally_lengths.values())
+        hits = sum(length * count for length, count in self.rally_lengths.items())
+        mean = hits / goals if goals else 0.0
+        variance = sum(count * (length - mean) ** 2 for length, count in self.rally_lengths.items())
+        powerups = {}
+        for name, totals in self.powerups.items():
+            # Goals and paddle hits per minute of play while the powerup was active
+            minutes = totals["active_ticks"] / (PONG2.FPS * 60)
+            powerups[name] = {
+                "pickups": totals["pickups"],
+                "active_share": totals["active_ticks"] / self.ticks if self.ticks else 0.0,
+                "goals_per_minute": totals["goals"] / minutes if minutes else None,
+                "hits_per_minute": totals["hits"] / minutes if minutes else None
+            }
+        minutes = self.ticks / (PONG2.FPS * 60)
+        return {
+            "config": self.config,
+            "matches": self.matches,
+            "win_rate": {"player1": self.wins[1] / self.matches, "player2": self.wins[2] / self.matches,
+                         "draw": self.wins[0] / self.matches},
+            "scores": dict(self.scores.most_common()),
+            "rally_length": {"mean": mean, "std": math.sqrt(variance / goals) if goals else 0.0,
+                             "max": max(self.rally_lengths, default=0),
+                             "histogram": {str(length): self.rally_lengths[length]
+                                           for length in sorted(self.rally_lengths)}},
+            "match_seconds": self.ticks / self.matches / PONG2.FPS,
+            "goals_per_minute": goals / minutes if minutes else 0.0,
+            "powerups": powerups
+        }
+
+def build_configs(args):
+    names = ("bot", "ball_speed", "paddle_speed", "duration", "stack_limit", "reaction_delay", "ai_error")
+    grid = itertools.product([args.bot], args.ball_speed, args.paddle_speed, args.duration,
+                             args.stack_limit, args.reaction_delay, args.ai_error)
+    return [dict(zip(names, values)) for values in grid]
+
+def build_jobs(configs, matches, seed):
+    # Seeds are fixed per (config, match) so any result can be replayed alone
+    for index, config in enumerate(configs):
+        for match in range(matches):
+            yield config, seed + index * matches + match
+
+def print_summary(stats):
+    for config_stats in stats:
+        report = config_stats.report()
+        win_rate = report["win_rate"]
+        rally = report["rally_length"]
+        print(f"{config_key(config_stats.config)}: {report['matches']} matches, "
+              f"P1 {win_rate['player1']:.0%} / P2 {win_rate['player2']:.0%} / draw {win_rate['draw']:.0%}, "
+              f"rally {rally['mean']:.1f} +/- {rally['std']:.1f} hits, "
+              f"{report['goals_per_minute']:.1f} goals/min")
+        for name, powerup in report["powerups"].items():
+            if powerup["goals_per_minute"] is not None:
+                print(f"    {name}: {powerup['pickups']} pickups, active {powerup['active_share']:.0%}, "
+                      f"{powerup['goals_per_minute']:.1f} goals/min while active")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play PONG2 bot matches over a grid of settings.")
+    parser.add_argument("--ball-speed", type=float, nargs="+", default=[PONG2.base_ball_speed])
+    parser.add_argument("--paddle-speed", type=float, nargs="+", default=[PONG2.paddle_speed])
+    parser.add_argument("--duration", type=int, nargs="+", default=[PONG2.powerup_duration],
+                        help="powerup durations in milliseconds")
+    parser.add_argument("--stack-limit", type=int, nargs="+", default=[3])
+    parser.add_argument("--bot", choices=["intercept", "chase"], default="intercept",
+                        help="paddle controller both players use")
+    parser.add_argument("--reaction-delay", type=float, nargs="+", default=[150],
+                        help="intercept bot reaction delays in milliseconds")
+    parser.add_argument("--ai-error", type=float, nargs="+", default=[20],
+                        help="intercept bot aim spreads in pixels")
+    parser.add_argument("--matches", type=int, default=20, help="matches per config")
+    parser.add_argument("--target-score", type=int, default=11)
+    parser.add_argument("--max-seconds", type=float, default=300,
+                        help="simulated seconds before a match is called")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first match")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--output", default="tournament.jsonl",
+                        help="file each match result is appended to as it finishes")
+    parser.add_argument("--report", default="tournament.json", help="aggregate report file")
+    args = parser.parse_args(argv)
+
+    configs = build_configs(args)
+    stats = {config_key(config): ConfigStats(config) for config in configs}
+    jobs = build_jobs(configs, args.matches, args.seed)
+    total = len(configs) * args.matches
+    max_ticks = int(args.max_seconds * PONG2.FPS)
+    workers = max(1, args.workers or 1)
+    start = time.perf_counter()
+    done = 0
+
+    # Keep a couple of matches queued per worker instead of submitting the
+    # whole grid up front, so results stream out and memory stays flat
+    with open(args.output, "w") as output, ProcessPoolExecutor(workers) as pool:
+        pending = set()
+        for config, seed in itertools.islice(jobs, workers * 2):
+            pending.add(pool.submit(play_match, config, seed, args.target_score, max_ticks))
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                output.write(json.dumps(result) + "\n")
+                stats[config_key(result["config"])].add(result)
+                done += 1
+                for config, seed in itertools.islice(jobs, 1):
+                    pending.add(pool.submit(play_match, config, seed, args.target_score, max_ticks))
+            output.flush()
+            elapsed = time.perf_counter() - start
+            print(f"\r{done}/{total} matches, {done / elapsed:.1f} matches/s", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+    with open(args.report, "w") as f:
+        json.dump([config_stats.report() for config_stats in stats.values()], f, indent=2)
+    print_summary(stats.values())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+import pytest
+import PARTICLES
+
+pytestmark = pytest.mark.skipif(PARTICLES.np is None, reason="needs NumPy")
+
+def test_clear_drops_every_particle():
+    surface = pygame.Surface((1000, 700))
+    particles = PARTICLES.ParticleSystem(seed=1)
+    particles.emit((500,), (350,), *PARTICLES.GOAL_BURST, PARTICLES.GOAL_COLOR)
+    assert particles.count > 0
+    assert particles.draw(surface)
+    particles.clear()
+    assert particles.count == 0
+    assert particles.draw(surface) == []
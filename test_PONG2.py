@@ -0,0 +1,72 @@
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import random
+import pygame
+import pytest
+import PONG2
+
+# Balls fired straight at a goal line must score, whatever sub-pixel
+# position and speed rounding leaves them with on the way there.
+
+BALLS = 2000
+MAX_TICKS = 1000  # The slowest ball moves a pixel a tick, so it crosses the field in time
+
+def parked_paddles():
+    # Above the field, out of every ball's path
+    paddle1 = pygame.Rect(50, -1000, PONG2.PADDLE_WIDTH, PONG2.PADDLE_HEIGHT)
+    paddle2 = pygame.Rect(PONG2.WIDTH - 50 - PONG2.PADDLE_WIDTH, -1000, PONG2.PADDLE_WIDTH, PONG2.PADDLE_HEIGHT)
+    return paddle1, paddle2
+
+def straight_shots(direction, seed):
+    rng = random.Random(seed)
+    for _ in range(BALLS):
+        x = rng.uniform(0, PONG2.WIDTH - PONG2.BALL_SIZE)
+        yield x, rng.uniform(0, PONG2.HEIGHT - PONG2.BALL_SIZE), direction * rng.uniform(2, 30), rng.uniform(0.5, 2.5)
+
+@pytest.mark.parametrize("direction, expected", [(-1, "right_score"), (1, "left_score")])
+def test_list_balls_score_on_both_goal_lines(direction, expected):
+    paddle1, paddle2 = parked_paddles()
+    stuck = 0
+    for x, y, dx, step in straight_shots(direction, seed=direction):
+        ball = PONG2.Ball(x, y, dx, 0)
+        for _ in range(MAX_TICKS):
+            result = ball.update(step, paddle1, paddle2)
+            if result is not None:
+                assert result == expected
+                break
+        else:
+            stuck += 1
+    assert stuck == 0
+
+@pytest.mark.skipif(PONG2.np is None, reason="needs NumPy")
+@pytest.mark.parametrize("direction", [-1, 1])
+def test_array_balls_score_on_both_goal_lines(direction):
+    paddle1, paddle2 = parked_paddles()
+    balls = PONG2.BallArray()
+    shots = list(straight_shots(direction, seed=direction))
+    balls.add(PONG2.WIDTH / 2, PONG2.HEIGHT / 2, 0, 0)  # The primary ball is never removed; keep it still
+    for x, y, dx, step in shots:
+        balls.add(x, y, dx, 0)
+    scored = 0
+    for tick in range(MAX_TICKS):
+        points1, points2, primary_scored = balls.update(shots[tick % len(shots)][3], paddle1, paddle2)
+        assert not primary_scored
+        scored += points1 + points2
+        assert (points1 if direction > 0 else points2) == points1 + points2
+    assert scored == len(shots)
+    assert balls.count == 1
+
+@pytest.mark.parametrize("hz", [30, 60, 120, 144, 240])
+@pytest.mark.parametrize("move", [-1, 1])
+def test_paddle_speed_does_not_depend_on_physics_rate(hz, move):
+    # Half a second of movement stays clear of the field's edges
+    sim = PONG2.PongSimulation(seed=1, dt=1 / hz)
+    start = sim.player1_y
+    for _ in range(hz // 2):
+        sim.move_paddles(move, move)
+    expected = PONG2.paddle_speed * PONG2.FPS * (hz // 2) / hz
+    assert sim.player1_y - start == pytest.approx(move * expected)
+    assert sim.player2_y - start == pytest.approx(move * expected)
+    assert sim.player1.y == round(sim.player1_y)